@@ -0,0 +1,225 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from . import metrics
+
+# ---------- Admission control ----------
+# Two layers in front of the chat endpoints:
+#   * token buckets per customer_id and per API key, so one noisy integration
+#     runs out of tokens instead of out of everyone's workers
+#   * a global limiter that sheds load (429 + Retry-After) when too many chat
+#     requests are in flight or the recent p99 is over budget; urgent messages
+#     get a reserve of extra slots and are exempt from the p99 rule
+#   AURA_RATE_CUSTOMER / _BURST   - tokens/s and bucket size per customer (5, 20)
+#   AURA_RATE_KEY / _BURST        - tokens/s and bucket size per API key (100, 200)
+#   AURA_RATE_BUCKETS             - buckets kept per store, least recently used evicted (100000)
+#   AURA_MAX_INFLIGHT             - concurrent chat requests before shedding (64)
+#   AURA_URGENT_RESERVE           - extra slots only urgent traffic may use (16)
+#   AURA_SHED_P99_MS              - shed non-urgent work while recent p99 exceeds this (0 = off)
+
+REJECTED = metrics.register(metrics.Counter(
+    "aura_admission_rejected_total", "Chat requests rejected by admission control.", ("reason",)))
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBuckets:
+    """Token buckets keyed by string, kept in an LRU of at most `maxsize` entries.
+
+    Each bucket is a two-item list [tokens, last refill time]. An evicted key
+    comes back with a full bucket, which only ever errs towards admitting.
+    """
+
+    def __init__(self, rate: float, burst: float, maxsize: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self.allowed = 0
+        self.limited = 0
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refill(self, key: str, now: float) -> list:
+        # caller holds the lock
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+            b[1] = now
+        return b
+
+    def take(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Spend `cost` tokens; returns (allowed, seconds until they would be available)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            b = self._refill(key, now)
+            if b[0] >= cost:
+                b[0] -= cost
+                self.allowed += 1
+                return True, 0.0
+            self.limited += 1
+            return False, (cost - b[0]) / self.rate
+
+    def take_up_to(self, key: str, n: int, now: Optional[float] = None) -> Tuple[int, float]:
+        """Spend up to `n` whole tokens; returns (granted, seconds until the next token)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            b = self._refill(key, now)
+            granted = min(n, int(b[0]))
+            b[0] -= granted
+            if granted:
+                self.allowed += 1
+            if granted < n:
+                self.limited += 1
+            return granted, (1 - b[0]) / self.rate if granted < n else 0.0
+
+    def refund(self, key: str, cost: float = 1.0):
+        """Give back tokens taken for work that was then rejected elsewhere."""
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is not None:
+                b[0] = min(self.burst, b[0] + cost)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "buckets": len(self._buckets),
+                "allowed": self.allowed, "limited": self.limited}
+
+
+class LoadShedder:
+    def __init__(self, max_inflight: int = 64, urgent_reserve: int = 16, p99_ms: float = 0.0,
+                 window_s: float = 10.0, min_samples: int = 20):
+        self.max_inflight = max_inflight
+        self.urgent_reserve = urgent_reserve
+        self.p99_ms = p99_ms
+        self.window_s = window_s
+        self.min_samples = min_samples
+        self.inflight = 0
+        self.admitted = 0
+        self.shed = 0
+        self._lat: "deque[Tuple[float, float]]" = deque(maxlen=2048)  # (finished at, ms)
+        self._p99: Optional[float] = None
+        self._p99_at = 0.0
+        self._lock = threading.Lock()
+
+    def recent_p99(self, now: float) -> Optional[float]:
+        # recomputed at most every 0.5s; samples age out so shedding can't latch on
+        if now - self._p99_at > 0.5:
+            ms = sorted(v for t, v in self._lat if now - t <= self.window_s)
+            self._p99 = ms[int(len(ms) * 0.99)] if len(ms) >= self.min_samples else None
+            self._p99_at = now
+        return self._p99
+
+    @contextmanager
+    def slot(self, urgent: bool):
+        now = time.monotonic()
+        with self._lock:
+            limit = self.max_inflight + (self.urgent_reserve if urgent else 0)
+            if self.inflight >= limit:
+                self.shed += 1
+                raise Rejected("overloaded", 1.0)
+            if not urgent and self.p99_ms:
+                p99 = self.recent_p99(now)
+                if p99 is not None and p99 > self.p99_ms:
+                    self.shed += 1
+                    raise Rejected("latency", 1.0)
+            self.inflight += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            done = time.monotonic()
+            with self._lock:
+                self.inflight -= 1
+                self._lat.append((done, (done - now) * 1000))
+
+    def stats(self) -> dict:
+        return {"inflight": self.inflight, "max_inflight": self.max_inflight,
+                "urgent_reserve": self.urgent_reserve, "p99_budget_ms": self.p99_ms or None,
+                "recent_p99_ms": self._p99, "admitted": self.admitted, "shed": self.shed}
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+MAX_BUCKETS = int(_env("AURA_RATE_BUCKETS", 100_000))
+customers = TokenBuckets(_env("AURA_RATE_CUSTOMER", 5), _env("AURA_RATE_CUSTOMER_BURST", 20), MAX_BUCKETS)
+api_keys = TokenBuckets(_env("AURA_RATE_KEY", 100), _env("AURA_RATE_KEY_BURST", 200), MAX_BUCKETS)
+shedder = LoadShedder(int(_env("AURA_MAX_INFLIGHT", 64)), int(_env("AURA_URGENT_RESERVE", 16)),
+                      _env("AURA_SHED_P99_MS", 0))
+
+
+def check_rate(customer_id: Optional[str], api_key: Optional[str]):
+    """Raise Rejected if the API key's or the customer's bucket is empty.
+
+    A request the customer's limit rejects gets its API-key token back, so one
+    customer hammering the API can't drain the key everyone behind it shares.
+    """
+    if api_key:
+        ok, wait = api_keys.take(api_key)
+        if not ok:
+            REJECTED.inc("api_key")
+            raise Rejected("api_key", wait)
+    if customer_id:
+        ok, wait = customers.take(customer_id)
+        if not ok:
+            refund_key(api_key, 1)
+            REJECTED.inc("customer")
+            raise Rejected("customer", wait)
+
+
+def grant_key(api_key: Optional[str], n: int) -> int:
+    """How many of `n` items the API key may send now (all of them without a key).
+
+    Never asks for more than the bucket holds, so a batch bigger than the burst
+    gets as many items as there are tokens instead of a retry that can't succeed.
+    Raises Rejected when not even one item fits.
+    """
+    if not api_key or not n:
+        return n
+    granted, wait = api_keys.take_up_to(api_key, n)
+    if granted < n:
+        REJECTED.inc("api_key")
+    if not granted:
+        raise Rejected("api_key", wait)
+    return granted
+
+
+def refund_key(api_key: Optional[str], n: int):
+    """Return `n` tokens granted to the API key for items that were then rejected."""
+    if api_key and n:
+        api_keys.refund(api_key, n)
+
+
+@contextmanager
+def admit(urgent: bool):
+    """Hold a global in-flight slot for the duration of a chat request."""
+    try:
+        with shedder.slot(urgent):
+            yield
+    except Rejected as e:
+        if e.reason in ("overloaded", "latency"):
+            REJECTED.inc(e.reason)
+        raise
+
+
+def stats() -> dict:
+    return {"customers": customers.stats(), "api_keys": api_keys.stats(), "shedder": shedder.stats()}
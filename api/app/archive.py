@@ -0,0 +1,230 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import bindparam, delete
+from sqlmodel import select
+
+from .db import DB_PATH, get_session
+from .models import ArchivedConversation, Conversation, Message, Sentiment
+
+log = logging.getLogger("aura.archive")
+
+# ---------- Cold tier ----------
+# Conversations idle for longer than AURA_ARCHIVE_AFTER_DAYS move out of the
+# conversation/message/sentiment tables into append-only month partitions under
+# AURA_ARCHIVE_DIR (default data/archive). Each conversation is one
+# zlib-compressed NDJSON block, one line per message with its sentiment, and
+# ArchivedConversation maps conversation_id -> (partition, offset, length).
+# Readers mmap the partition and decompress just that block.
+#
+# Rollups, term counts, inbox fields and churn are maintained on write, so
+# archived messages stay counted; rollups.rebuild() and terms.rebuild() read the
+# archive too. Archived messages drop out of full-text search and raw-score
+# percentiles.
+#
+# A conversation that gets a new message while it is being archived keeps its
+# row and the new message; history merges both tiers either way.
+
+ARCHIVE_DIR = os.getenv("AURA_ARCHIVE_DIR") or os.path.abspath(os.path.join(DB_PATH, "archive"))
+ARCHIVE_AFTER_DAYS = float(os.getenv("AURA_ARCHIVE_AFTER_DAYS", "180"))
+BATCH = 500
+ID_CHUNK = 500  # ids per IN (...) delete
+
+
+def partition_path(partition: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"messages-{partition}.ndjson.z")
+
+
+def encode(rows) -> bytes:
+    lines = []
+    for m, s in rows:
+        d = {"id": m.id, "sender": m.sender, "text": m.text, "ts": m.ts.isoformat()}
+        if s is not None:
+            d.update(score=s.score, label=s.label, urgent=s.urgent)
+        lines.append(json.dumps(d, ensure_ascii=False))
+    return zlib.compress(("\n".join(lines) + "\n").encode(), 6)
+
+
+def decode(block: bytes) -> List[dict]:
+    out = []
+    for line in zlib.decompress(block).splitlines():
+        d = json.loads(line)
+        d["ts"] = datetime.fromisoformat(d["ts"])
+        out.append(d)
+    return out
+
+
+# ---------- Partition reader ----------
+class Partitions:
+    """Read-only mmaps of partition files, least recently used closed first."""
+
+    def __init__(self, maxsize: int = 16):
+        self.maxsize = maxsize
+        self._maps: "OrderedDict[str, mmap.mmap]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, partition: str, offset: int, length: int) -> bytes:
+        path = partition_path(partition)
+        with self._lock:
+            mm = self._maps.get(path)
+            if mm is not None and offset + length > len(mm):
+                # appended to since it was mapped
+                self._maps.pop(path).close()
+                mm = None
+            if mm is None:
+                with open(path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[path] = mm
+                if len(self._maps) > self.maxsize:
+                    self._maps.popitem(last=False)[1].close()
+            self._maps.move_to_end(path)
+            return mm[offset:offset + length]
+
+    def close(self):
+        with self._lock:
+            for mm in self._maps.values():
+                mm.close()
+            self._maps.clear()
+
+
+partitions = Partitions()
+
+
+def read_entry(e: ArchivedConversation) -> List[dict]:
+    return decode(partitions.read(e.partition, e.byte_offset, e.byte_length))
+
+
+def read_messages(entries, after: Optional[datetime] = None, after_id: Optional[str] = None) -> List[dict]:
+    """Messages of `entries` past the history cursor (ts > after, or ts == after and id > after_id).
+
+    Maps, decompresses and parses every block, so async callers run it in a thread.
+    """
+    out = []
+    for e in entries:
+        for d in read_entry(e):
+            if after is None or d["ts"] > after or (d["ts"] == after and after_id is not None and d["id"] > after_id):
+                out.append(d)
+    return out
+
+
+def entries_for(conversation_id: str):
+    return (select(ArchivedConversation)
+            .where(ArchivedConversation.conversation_id == conversation_id)
+            .order_by(ArchivedConversation.id))
+
+
+def scored_messages(session) -> Iterator[tuple]:
+    """Every archived customer message as a rollups.ScoredMessage (for rollups.rebuild)."""
+    for e in session.exec(select(ArchivedConversation).order_by(ArchivedConversation.id)):
+        for d in read_entry(e):
+            if d["sender"] == "customer" and "label" in d:
+                yield e.customer_id, d["ts"], d["label"], d["urgent"], d["score"]
+
+
+def customer_texts(session) -> Iterator[tuple]:
+    """(ts, text) of every archived customer message (for terms.rebuild)."""
+    for e in session.exec(select(ArchivedConversation).order_by(ArchivedConversation.id)):
+        for d in read_entry(e):
+            if d["sender"] == "customer":
+                yield d["ts"], d["text"]
+
+
+# ---------- Archival job ----------
+def archive_batch(session, cutoff: datetime, limit: int = BATCH) -> Dict[str, int]:
+    """Move up to `limit` conversations idle since before `cutoff` to the archive.
+
+    The blocks are written and fsynced before the transaction that indexes them
+    and deletes the hot rows commits; a crash in between leaves only unreferenced
+    bytes in a partition file.
+    """
+    convs = session.exec(
+        select(Conversation).where(Conversation.last_ts < cutoff).order_by(Conversation.last_ts).limit(limit)
+    ).all()
+    if not convs:
+        return {"conversations": 0, "messages": 0}
+    by_conv = defaultdict(list)
+    for m, s in session.exec(
+        select(Message, Sentiment)
+        .outerjoin(Sentiment, Sentiment.message_id == Message.id)
+        .where(Message.conversation_id.in_([c.id for c in convs]))
+        .order_by(Message.conversation_id, Message.ts, Message.id)
+    ):
+        by_conv[m.conversation_id].append((m, s))
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    by_month = defaultdict(list)
+    for c in convs:
+        if by_conv[c.id]:
+            by_month[c.last_ts.strftime("%Y-%m")].append(c)
+    entries, msg_ids = [], []
+    for partition, month_convs in by_month.items():
+        with open(partition_path(partition), "ab") as f:
+            for c in month_convs:
+                rows = by_conv[c.id]
+                block = encode(rows)
+                entries.append(ArchivedConversation(
+                    conversation_id=c.id, customer_id=c.customer_id, partition=partition,
+                    byte_offset=f.tell(), byte_length=len(block), message_count=len(rows),
+                    first_ts=rows[0][0].ts, last_ts=rows[-1][0].ts,
+                ))
+                f.write(block)
+                msg_ids.extend(m.id for m, _ in rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    session.add_all(entries)
+    for i in range(0, len(msg_ids), ID_CHUNK):
+        chunk = msg_ids[i:i + ID_CHUNK]
+        session.execute(delete(Sentiment).where(Sentiment.message_id.in_(chunk)))
+        session.execute(delete(Message).where(Message.id.in_(chunk)))
+    # only rows nobody wrote to since we read them
+    conv = Conversation.__table__
+    session.execute(
+        delete(conv).where(conv.c.id == bindparam("cid"), conv.c.last_ts == bindparam("lts")),
+        [{"cid": c.id, "lts": c.last_ts} for c in convs],
+    )
+    session.commit()
+    return {"conversations": len(convs), "messages": len(msg_ids)}
+
+
+_job_lock = threading.Lock()
+
+
+def run(older_than_days: Optional[float] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Archive every conversation idle for longer than `older_than_days`, in batches."""
+    days = ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    total = {"conversations": 0, "messages": 0}
+    with _job_lock:
+        while True:
+            with get_session() as session:
+                n = archive_batch(session, cutoff)
+            for k in total:
+                total[k] += n[k]
+            if n["conversations"] < BATCH:
+                break
+    log.info("archived %d conversations (%d messages) idle since %s",
+             total["conversations"], total["messages"], cutoff.isoformat())
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Move idle conversations to the archive tier.")
+    ap.add_argument("--older-than-days", type=float, default=None,
+                    help=f"idle age to archive (default AURA_ARCHIVE_AFTER_DAYS={ARCHIVE_AFTER_DAYS:g})")
+    args = ap.parse_args()
+    from .db import init_db
+    init_db()
+    print(run(args.older_than_days))
+
+
+if __name__ == "__main__":
+    main()
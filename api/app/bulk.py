@@ -0,0 +1,274 @@
+import csv
+import io
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from operator import itemgetter
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import case, insert, or_
+from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+
+from .db import get_session
+from .scoring import get_scorer
+from .models import Conversation, Message, Sentiment, new_ids
+from . import rollups, search, terms
+
+log = logging.getLogger("aura.bulk")
+
+SENDERS = {"customer", "bot", "agent"}
+CHUNK = 20000
+MAX_ERRORS = 20
+
+# ---------- NDJSON import ----------
+# One JSON object per line, either a single message
+#   {"conversation_id", "customer_id", "sender", "text", "ts"?, "id"?}
+# or a whole conversation
+#   {"conversation_id"|"id", "customer_id", "messages": [{"sender", "text", "ts"?, "id"?}, ...]}
+# Customer messages are scored (no bot replies are generated) and every chunk
+# of rows is written with executemany inserts in one transaction.
+
+
+class ImportJob:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.lines = 0
+        self.messages = 0
+        self.errors: List[dict] = []
+        self.error_count = 0
+
+    def fail(self, line_no: Optional[int], reason: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line_no, "error": reason})
+
+    def snapshot(self) -> dict:
+        elapsed = (self.finished or time.time()) - self.started
+        return {
+            "job_id": self.id,
+            "done": self.finished is not None,
+            "lines": self.lines,
+            "messages": self.messages,
+            "errors": self.error_count,
+            "first_errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "messages_per_s": round(self.messages / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+JOBS: Dict[str, ImportJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_job(job_id: Optional[str] = None) -> ImportJob:
+    job = ImportJob(job_id or str(uuid4()))
+    with _jobs_lock:
+        JOBS[job.id] = job
+        # keep the registry small; finished jobs are only kept for polling
+        for old in [k for k, j in JOBS.items() if j.finished and time.time() - j.finished > 3600]:
+            del JOBS[old]
+    return job
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering more than one partial line."""
+    tail = b""
+    async for chunk in chunks:
+        if not chunk: continue
+        parts = (tail + chunk).split(b"\n")
+        tail = parts.pop()
+        for line in parts:
+            yield line
+    if tail:
+        yield tail
+
+
+def _parse_ts(raw) -> datetime:
+    if raw is None:
+        return datetime.utcnow()
+    return rollups.to_utc_naive(datetime.fromisoformat(raw))
+
+
+def executemany(session, table, rows: List[dict]):
+    """Chunked multi-row insert. On SQLite, hand tuples straight to the driver's
+    executemany (skipping per-row bind processing); elsewhere use Core."""
+    if not rows: return
+    if session.get_bind().dialect.name != "sqlite":
+        session.execute(insert(table), rows)
+        return
+    cols = list(rows[0])
+    sql = f"INSERT INTO {table.name} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+    data = list(map(itemgetter(*cols), rows))
+    dt_cols = [i for i, c in enumerate(cols) if isinstance(rows[0][c], datetime)]
+    if dt_cols:
+        data = [list(t) for t in data]
+        for t in data:
+            for i in dt_cols:
+                t[i] = t[i].isoformat(" ", "microseconds")  # SQLAlchemy's SQLite DateTime format
+        data = list(map(tuple, data))
+    session.connection().exec_driver_sql(sql, data)
+
+
+class Importer:
+    def __init__(self, job: ImportJob, chunk: int = CHUNK):
+        self.job = job
+        self.chunk = chunk
+        self.rows: List[dict] = []
+        self.customers: Dict[str, str] = {}
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.chunk
+
+    def feed(self, line: bytes):
+        self.job.lines += 1
+        line_no = self.job.lines
+        if not line.strip(): return
+        try:
+            obj = json.loads(line)
+            if "messages" in obj:
+                conv_id = obj.get("conversation_id") or obj.get("id")
+            else:
+                conv_id = obj["conversation_id"]
+            customer_id = obj["customer_id"]
+            items = obj["messages"] if "messages" in obj else [obj]
+            parsed = []
+            for it in items:
+                if it["sender"] not in SENDERS:
+                    raise ValueError(f"unknown sender {it['sender']!r}")
+                parsed.append({
+                    "id": it.get("id"),
+                    "conversation_id": conv_id,
+                    "sender": it["sender"],
+                    "text": str(it["text"]),
+                    "ts": _parse_ts(it.get("ts")),
+                })
+            if not conv_id:
+                raise ValueError("missing conversation_id")
+        except (ValueError, KeyError, TypeError) as e:
+            self.job.fail(line_no, f"{type(e).__name__}: {e}")
+            return
+        self.add(conv_id, customer_id, parsed)
+
+    def add(self, conv_id: str, customer_id: str, messages: List[dict]):
+        """Buffer already-parsed messages ({"id"|None, "conversation_id", "sender", "text", "ts"})."""
+        self.customers.setdefault(conv_id, customer_id)
+        self.rows.extend(messages)
+
+    def flush(self):
+        """Write the buffered rows in one transaction (blocking; run off the event loop)."""
+        rows, customers = self.rows, self.customers
+        self.rows, self.customers = [], {}
+        if not rows: return
+        ids = iter(new_ids(len(rows)))
+        for r in rows:
+            if not r["id"]:
+                r["id"] = next(ids)
+        cust_rows = [r for r in rows if r["sender"] == "customer"]
+        scores = get_scorer().score_batch([r["text"] for r in cust_rows])
+        sentiments = [
+            {"id": sid, "message_id": r["id"], "score": s["score"], "label": s["label"], "urgent": s["urgent"]}
+            for sid, r, s in zip(new_ids(len(cust_rows)), cust_rows, scores)
+        ]
+
+        convs: Dict[str, dict] = {}
+        for r in rows:
+            c = convs.get(r["conversation_id"])
+            if c is None:
+                convs[r["conversation_id"]] = {
+                    "id": r["conversation_id"], "customer_id": customers[r["conversation_id"]],
+                    "created_at": r["ts"], "last_text": r["text"], "last_ts": r["ts"], "message_count": 1,
+                }
+                continue
+            c["message_count"] += 1
+            c["created_at"] = min(c["created_at"], r["ts"])
+            if r["ts"] >= c["last_ts"]:
+                c["last_ts"], c["last_text"] = r["ts"], r["text"]
+
+        try:
+            self._write(rows, customers, cust_rows, scores, sentiments, convs)
+        except IntegrityError as e:
+            # e.g. a message id that already exists: the chunk is skipped as a unit
+            self.job.fail(None, f"chunk of {len(rows)} messages ending at line {self.job.lines} rejected: {e.orig}")
+            return
+        self.job.messages += len(rows)
+        log.info("import %s: %d messages (%d lines)", self.job.id, self.job.messages, self.job.lines)
+
+    def _write(self, rows, customers, cust_rows, scores, sentiments, convs):
+        with get_session() as session:
+            t = Conversation.__table__
+            stmt = rollups.insert_for(session)(t)
+            newer = or_(t.c.last_ts.is_(None), stmt.excluded.last_ts >= t.c.last_ts)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={
+                    "message_count": t.c.message_count + stmt.excluded.message_count,
+                    "last_ts": case((newer, stmt.excluded.last_ts), else_=t.c.last_ts),
+                    "last_text": case((newer, stmt.excluded.last_text), else_=t.c.last_text),
+                },
+            )
+            session.execute(stmt, list(convs.values()))
+            with search.bulk_indexing(session):
+                executemany(session, Message.__table__, rows)
+            executemany(session, Sentiment.__table__, sentiments)
+            rollups.record_messages(session, (
+                (customers[r["conversation_id"]], r["ts"], s["label"], s["urgent"], s["score"])
+                for r, s in zip(cust_rows, scores)
+            ))
+            terms.record(session, ((r["ts"], r["text"]) for r in cust_rows))
+            session.commit()
+
+
+# ---------- Export ----------
+EXPORT_COLUMNS = ["id", "conversation_id", "customer_id", "sender", "text", "ts", "score", "label", "urgent"]
+EXPORT_CHUNK = 2000
+
+
+def export_query(since: Optional[datetime] = None, until: Optional[datetime] = None, customer_id: Optional[str] = None):
+    q = (
+        select(Message.id, Message.conversation_id, Conversation.customer_id, Message.sender, Message.text,
+               Message.ts, Sentiment.score, Sentiment.label, Sentiment.urgent)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .outerjoin(Sentiment, Sentiment.message_id == Message.id)
+    )
+    if since is not None:
+        q = q.where(Message.ts >= since)
+    if until is not None:
+        q = q.where(Message.ts < until)
+    if customer_id is not None:
+        # customer's conversations in id order from (customer_id, id), each
+        # conversation's messages from (conversation_id, ts): at most one
+        # conversation is sorted at a time
+        return q.where(Conversation.customer_id == customer_id).order_by(Conversation.id, Message.ts)
+    if since is not None or until is not None:
+        return q.order_by(Message.ts)  # range scan of ix_message_ts
+    # (conversation_id, ts) is indexed, so rows stream in index order without a sort
+    return q.order_by(Message.conversation_id, Message.ts)
+
+
+def iter_export(q, fmt: str) -> Iterator[str]:
+    """Yield the export in EXPORT_CHUNK-row pieces from a server-side / chunked cursor."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(EXPORT_COLUMNS)
+        yield buf.getvalue()  # before the query runs
+        buf.seek(0); buf.truncate()
+    with get_session() as session:
+        result = session.execute(q.execution_options(stream_results=True, yield_per=EXPORT_CHUNK))
+        if fmt == "csv":
+            for part in result.partitions():
+                w.writerows((*r[:5], r[5].isoformat(), *r[6:]) for r in part)
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+        else:
+            for part in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_COLUMNS, (*r[:5], r[5].isoformat(), *r[6:])))) + "\n" for r in part
+                )
@@ -1,15 +1,159 @@
 # D:\Projects\aura\api\app\db.py
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from typing import Optional
+import atexit
+import math
 import os
+import shutil
+import tempfile
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "data")
-os.makedirs(DB_PATH, exist_ok=True)
-DATABASE_URL = f"sqlite:///{os.path.abspath(os.path.join(DB_PATH, 'aura.db'))}"
+DEFAULT_URL = f"sqlite:///{os.path.abspath(os.path.join(DB_PATH, 'aura.db'))}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# ---------- Storage backends ----------
+# Selected with AURA_DB_BACKEND (sqlite | postgres | memory) or inferred from
+# AURA_DATABASE_URL / DATABASE_URL. All three hand out the same SQLModel
+# Session from get_session(), so call sites don't change, plus an AsyncSession
+# from get_async_session() on the matching asyncio driver (aiosqlite / psycopg
+# async) for the async routes.
+#   sqlite   - file DB in WAL mode with tuned pragmas (default: data/aura.db)
+#   postgres - pooled psycopg engine with pre-ping and server-side prepared statements
+#   memory   - throwaway SQLite file for tests and benchmarks, in /dev/shm when
+#              available and deleted at exit; same WAL locking as sqlite, with
+#              synchronous=OFF since nothing in it has to survive
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.getenv("AURA_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("AURA_SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": "-65536",     # 64 MiB page cache
+    "temp_store": "MEMORY",
+    "mmap_size": "268435456",   # 256 MiB
+}
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _scratch_dir() -> str:
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    path = tempfile.mkdtemp(prefix="aura-mem-", dir=shm)
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+def resolve_backend(url: Optional[str], backend: Optional[str]) -> tuple:
+    backend = (backend or os.getenv("AURA_DB_BACKEND") or "").lower() or None
+    url = url or os.getenv("AURA_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if backend == "memory":
+        if not (url and url.startswith("sqlite:///")):
+            url = f"sqlite:///{os.path.join(_scratch_dir(), 'aura.db')}"
+        return "memory", url
+    if url and url.startswith("postgres://"):  # Heroku/Railway style
+        url = "postgresql+psycopg://" + url[len("postgres://"):]
+    elif url and url.startswith("postgresql://"):
+        url = "postgresql+psycopg://" + url[len("postgresql://"):]
+    if backend is None:
+        backend = "postgres" if url and url.startswith("postgresql") else "sqlite"
+    if backend == "postgres":
+        if not url:
+            raise ValueError("AURA_DB_BACKEND=postgres needs AURA_DATABASE_URL")
+        return backend, url
+    if backend == "sqlite":
+        return backend, url or DEFAULT_URL
+    raise ValueError(f"unknown AURA_DB_BACKEND {backend!r}")
+
+def _set_pragmas(pragmas: dict):
+    def on_connect(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        for k, v in pragmas.items():
+            cur.execute(f"PRAGMA {k}={v}")
+        cur.close()
+    return on_connect
+
+def logaddexp(a: float, b: float) -> float:
+    """log(exp(a) + exp(b)) without overflow; also a SQL function on SQLite connections."""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a)) if b > -math.inf else a
+
+def _sqlite_functions(dbapi_conn, _):
+    dbapi_conn.create_function("logaddexp", 2, logaddexp, deterministic=True)
+
+def make_engine(url: Optional[str] = None, backend: Optional[str] = None, use_async: bool = False):
+    backend, url = resolve_backend(url, backend)
+    create = create_async_engine if use_async else create_engine
+    if use_async and url.startswith("sqlite://"):
+        url = "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    if backend == "postgres":
+        return create(
+            url,
+            pool_size=_env_int("AURA_DB_POOL_SIZE", 10),
+            max_overflow=_env_int("AURA_DB_MAX_OVERFLOW", 20),
+            pool_timeout=_env_int("AURA_DB_POOL_TIMEOUT", 30),
+            pool_recycle=_env_int("AURA_DB_POOL_RECYCLE", 1800),
+            pool_pre_ping=True,
+            query_cache_size=_env_int("AURA_DB_QUERY_CACHE_SIZE", 1200),
+            # psycopg prepares a statement server-side after this many executions
+            connect_args={"prepare_threshold": _env_int("AURA_PG_PREPARE_THRESHOLD", 5)},
+        )
+    if url == DEFAULT_URL:
+        os.makedirs(DB_PATH, exist_ok=True)
+    pragmas = {**SQLITE_PRAGMAS, "synchronous": "OFF"} if backend == "memory" else SQLITE_PRAGMAS
+    eng = create(url, connect_args={"check_same_thread": False})
+    event.listen(eng.sync_engine if use_async else eng, "connect", _set_pragmas(pragmas))
+    event.listen(eng.sync_engine if use_async else eng, "connect", _sqlite_functions)
+    return eng
+
+_backend, _url = resolve_backend(None, None)
+engine = make_engine(_url, _backend)
+async_engine = make_engine(_url, _backend, use_async=True)
+
+def configure(url: Optional[str] = None, backend: Optional[str] = None):
+    """Swap the process-wide engines (tests, benchmarks, tools)."""
+    global engine, async_engine
+    engine.dispose()
+    async_engine.sync_engine.dispose(close=False)
+    backend, url = resolve_backend(url, backend)
+    engine = make_engine(url, backend)
+    async_engine = make_engine(url, backend, use_async=True)
+    return engine
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    return add_missing_columns()
+
+# indexes older schemas created that duplicate a primary key or the prefix of a composite
+# index, or that cover a column nothing reads any more
+RETIRED_INDEXES = ("ix_conversation_id", "ix_message_id", "ix_message_conversation_id", "ix_sentiment_id", "ix_faq_id",
+                   "ix_customerrisk_decay_mass", "ix_conversation_customer_id")
+
+def add_missing_columns():
+    """Additive migration: create columns and indexes that create_all skips on existing tables,
+    and drop RETIRED_INDEXES.
+
+    Returns the (table, column) pairs that were added so callers can backfill them.
+    """
+    added = []
+    with engine.begin() as conn:
+        insp = inspect(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            missing = [c for c in table.columns if c.name not in have]
+            for col in missing:
+                default = f" DEFAULT {col.server_default.arg}" if col.server_default is not None else ""
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}{default}"))
+                added.append((table.name, col.name))
+            for idx in table.indexes:
+                idx.create(conn, checkfirst=True)
+        for name in RETIRED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    return added
 
 def get_session() -> Session:
     return Session(engine)
+
+def get_async_session() -> AsyncSession:
+    # no expire on commit: an expired attribute can't lazy-load outside an await
+    return AsyncSession(async_engine, expire_on_commit=False)
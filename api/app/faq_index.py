@@ -0,0 +1,112 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from sqlmodel import select
+
+from .models import FAQ as FAQModel
+
+TOKEN_RE = re.compile(r"[a-zA-Z]{4,}")
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+class FAQIndex:
+    """Token -> FAQ inverted index used by match_faq.
+
+    FAQs are kept in table scan order so ties resolve to the same row the
+    old linear scan picked. Entries are detached copies, safe to return
+    after the loading session is closed. `version` changes whenever the
+    indexed set may have changed, so derived caches can key on it.
+
+    Other workers' FAQ writes only show up on reload, so the index counts as
+    stale `max_age` seconds after it was loaded; a reload that finds the same
+    rows keeps the version.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._snapshot: tuple = ()
+        self.version = 0
+        self._faqs: List[FAQModel] = []
+        self._terms: List[Set[str]] = []
+        self._pos: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+
+    @property
+    def fresh(self) -> bool:
+        """Loaded, and less than max_age seconds ago."""
+        return self._loaded and (self.max_age is None or time.monotonic() - self._loaded_at < self.max_age)
+
+    @staticmethod
+    def _terms_for(faq: FAQModel) -> Set[str]:
+        return tokenize(faq.question) | {t.lower() for t in (faq.tags or [])}
+
+    @staticmethod
+    def _copy(faq: FAQModel) -> FAQModel:
+        return FAQModel(id=faq.id, question=faq.question, answer=faq.answer, tags=list(faq.tags or []))
+
+    def _insert(self, faq: FAQModel):
+        faq = self._copy(faq)
+        terms = self._terms_for(faq)
+        pos = self._pos.get(faq.id)
+        if pos is None:
+            pos = len(self._faqs)
+            self._pos[faq.id] = pos
+            self._faqs.append(faq)
+            self._terms.append(terms)
+        else:
+            for t in self._terms[pos]:
+                self._postings[t].remove(pos)
+            self._faqs[pos] = faq
+            self._terms[pos] = terms
+        for t in terms:
+            self._postings[t].append(pos)
+
+    def rebuild(self, session):
+        rows = session.exec(select(FAQModel)).all()
+        snapshot = tuple((f.id, f.question, f.answer, tuple(f.tags or ())) for f in rows)
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            if self._loaded and snapshot == self._snapshot:
+                return
+            self._faqs, self._terms, self._pos = [], [], {}
+            self._postings = defaultdict(list)
+            for faq in rows:
+                self._insert(faq)
+            self._snapshot = snapshot
+            self._loaded = True
+            self.version += 1
+
+    def add(self, faq: FAQModel):
+        with self._lock:
+            if self._loaded:
+                self._insert(faq)
+            self.version += 1
+
+    def match(self, text: str, session) -> Optional[FAQModel]:
+        tokens = tokenize(text)
+        if not tokens: return None
+        if session is not None and not self.fresh:
+            self.rebuild(session)
+        with self._lock:
+            scores: Dict[int, int] = defaultdict(int)
+            for t in tokens:
+                for pos in self._postings.get(t, ()):
+                    scores[pos] += 1
+            if not scores: return None
+            # highest overlap wins; earliest row breaks ties, as in the old scan
+            pos = min(scores, key=lambda p: (-scores[p], p))
+            return self._faqs[pos]
+
+
+# reloaded as often as cached replies expire, see main.reply_cache
+faq_index = FAQIndex(max_age=float(os.getenv("AURA_REPLY_CACHE_TTL", "300")))
@@ -0,0 +1,112 @@
+import re
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+# ---------- Sentiment & intent lexicons ----------
+POS_WORDS = {"great","thanks","thank you","love","awesome","helpful","happy","amazing","perfect"}
+NEG_WORDS = {"angry","upset","terrible","hate","late","broken","refund","worst","delay","ridiculous","issue","complaint"}
+URGENT_TOKENS = {"urgent","asap","now","immediately","right away","cant","can't","cannot","down","escalate","manager","supervisor"}
+
+INTENT_RULES = [
+    ("refund",   ["refund","money back","return"]),
+    ("pricing",  ["pricing","price","cost","plan","plans","upgrade"]),
+    ("delivery", ["delivery","deliver","shipping","ship","track","tracking","order status","where is my order"]),
+    ("payment",  ["payment","charge","charged","bill","billing","invoice","card","failed","declined"]),
+    ("account",  ["support","help","contact","agent","human","login","password","reset"]),
+    ("greeting", ["hello","hi ","hey","good morning","good evening","thanks","thank you"]),
+]
+
+# ---------- Compiled matcher ----------
+# Every keyword is folded into one prefix-trie regex inside a lookahead, so a
+# single C-level scan tries each start position once and takes the longest
+# keyword there. Keywords matching at the same position are all prefixes of
+# that longest hit, so expanding it to its keyword prefixes recovers exactly
+# the substrings the old per-keyword `w in t` tests found.
+_KEYWORDS = sorted(POS_WORDS | NEG_WORDS | URGENT_TOKENS | {k for _, keys in INTENT_RULES for k in keys})
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        kids = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not kids: return ""
+        body = kids[0] if len(kids) == 1 else "(?:" + "|".join(kids) + ")"
+        # greedy optional tail: prefer the longer keyword when the text allows it
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(trie)
+
+
+_PATTERN = re.compile("(?=(" + _trie_pattern(_KEYWORDS) + "))")
+_PREFIXES: Dict[str, FrozenSet[str]] = {
+    k: frozenset(p for p in _KEYWORDS if k.startswith(p)) for k in _KEYWORDS
+}
+_INTENT_ORDER = {k: i for i, (_, keys) in reversed(list(enumerate(INTENT_RULES))) for k in keys}
+_SEP = "\x00"  # no keyword contains it, so hits never span two batched texts
+
+
+def _collect(matches: Iterable) -> Set[str]:
+    found: Set[str] = set()
+    for m in matches:
+        found |= _PREFIXES[m.group(1)]
+    return found
+
+
+def scan(text: str) -> Set[str]:
+    """Return every lexicon keyword occurring as a substring of `text`."""
+    return _collect(_PATTERN.finditer(text.lower()))
+
+
+def _sentiment(found: Set[str]) -> dict:
+    pos = len(found & POS_WORDS)
+    neg = len(found & NEG_WORDS)
+    score = 0.0
+    if pos > neg: score = min(1.0, 0.25*(pos-neg))
+    elif neg > pos: score = max(-1.0, -0.25*(neg-pos))
+    label = "pos" if score > 0.05 else ("neg" if score < -0.05 else "neu")
+    urgent = bool(found & URGENT_TOKENS) or (label=="neg" and neg>=2)
+    return {"score": score, "label": label, "urgent": urgent}
+
+
+def _intent(found: Set[str]) -> Optional[str]:
+    ranks = [_INTENT_ORDER[k] for k in found if k in _INTENT_ORDER]
+    return INTENT_RULES[min(ranks)][0] if ranks else None
+
+
+def simple_sentiment(text: str) -> dict:
+    return _sentiment(scan(text))
+
+
+def detect_intent(text: str) -> Optional[str]:
+    return _intent(scan(text))
+
+
+def analyze(text: str) -> dict:
+    """Sentiment plus intent from a single scan."""
+    found = scan(text)
+    return {**_sentiment(found), "intent": _intent(found)}
+
+
+def analyze_batch(texts: List[str]) -> List[dict]:
+    """`analyze` for many texts with one scan over their concatenation."""
+    if not texts: return []
+    lowered = [t.lower() for t in texts]
+    starts, offset = [], 0
+    for t in lowered:
+        starts.append(offset)
+        offset += len(t) + 1
+    hits: Dict[int, list] = defaultdict(list)
+    for m in _PATTERN.finditer(_SEP.join(lowered)):
+        hits[bisect_right(starts, m.start()) - 1].append(m)
+    out = []
+    for i in range(len(texts)):
+        found = _collect(hits.get(i, ()))
+        out.append({**_sentiment(found), "intent": _intent(found)})
+    return out
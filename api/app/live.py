@@ -0,0 +1,86 @@
+import asyncio
+import json
+import threading
+from typing import List, Optional, Set
+
+# ---------- Live dashboard fan-out ----------
+# Writers publish small events once; every subscriber gets the same pre-encoded
+# SSE frame on its own bounded queue. A slow client that falls behind loses its
+# oldest frames and is sent a "resync" event so it can refetch the summary.
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, frame: str):
+        # runs on the subscriber's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    async def get(self) -> str:
+        frame = await self.queue.get()
+        if self.dropped:
+            self.dropped = 0
+            return encode([{"type": "resync"}]) + frame
+        return frame
+
+
+def encode(events: List[dict]) -> str:
+    return "".join(f"event: {e['type']}\ndata: {json.dumps(e, default=str)}\n\n" for e in events)
+
+
+class Broker:
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.published = 0
+        self._subs: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(asyncio.get_running_loop(), self.maxsize)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subs.discard(sub)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    def publish(self, events: List[dict]):
+        """Thread-safe; callable from sync route handlers running in the threadpool."""
+        if not events: return
+        with self._lock:
+            subs = list(self._subs)
+        self.published += 1
+        if not subs: return
+        frame = encode(events)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, frame)
+            except RuntimeError:  # subscriber's loop already closed
+                self.unsubscribe(sub)
+
+
+broker = Broker()
+
+
+def turn_events(conv_id: str, customer_id: str, message_id: str, text: str, ts, sent: dict,
+                churn: Optional[float]) -> List[dict]:
+    """Events for one scored customer message, mirroring the summary's counters."""
+    events = [{"type": "delta", "volume": 1, sent["label"]: 1, "urgent": int(sent["urgent"])}]
+    if sent["urgent"]:
+        events.append({"type": "urgent", "conversation_id": conv_id, "customer_id": customer_id,
+                       "message_id": message_id, "text": text, "ts": ts,
+                       "label": sent["label"], "score": sent["score"]})
+    if churn is not None:
+        events.append({"type": "churn", "customer_id": customer_id, "risk": churn})
+    return events
@@ -1,15 +1,21 @@
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
-from uuid import uuid4
-import re
-from collections import Counter, defaultdict
-
-from .db import init_db, get_session
-from .models import Conversation, Message, Sentiment, FAQ as FAQModel
-from sqlmodel import select
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import os
+import time
+
+from .db import init_db, get_async_session, get_session
+from .models import ArchivedConversation, Conversation, Message, Sentiment, FAQ as FAQModel, new_id
+from .cache import LRUCache
+from .faq_index import faq_index
+from .lexicon import analyze_batch, detect_intent, simple_sentiment
+from . import admission, archive, bulk, db, live, metrics, rollups, scoring, search, terms, timeseries, writer
+from sqlmodel import select, or_, and_
 
 app = FastAPI(title="AURA API", version="0.3.0")
 
@@ -21,6 +27,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if metrics.ENABLED:
+    app.add_middleware(metrics.TimingMiddleware)
 
 AGENT_API_KEY = "manager-demo-key"  # demo key
 
@@ -44,95 +52,91 @@ class ChatReply(BaseModel):
     conversation_id: str
     message_id: str
 
+class BatchSendReq(BaseModel):
+    # items are validated one by one so a bad item fails alone
+    items: List[Any] = Field(..., max_length=1000)
+
+class BatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[ChatReply] = None
+    error: Optional[str] = None
+
 class FAQItem(BaseModel):
     id: str
     question: str
     answer: str
     tags: List[str] = []
 
-# ---------- Sentiment & intent ----------
-POS_WORDS = {"great","thanks","thank you","love","awesome","helpful","happy","amazing","perfect"}
-NEG_WORDS = {"angry","upset","terrible","hate","late","broken","refund","worst","delay","ridiculous","issue","complaint"}
-URGENT_TOKENS = {"urgent","asap","now","immediately","right away","cant","can't","cannot","down","escalate","manager","supervisor"}
-
-INTENT_RULES = [
-    ("refund",   ["refund","money back","return"]),
-    ("pricing",  ["pricing","price","cost","plan","plans","upgrade"]),
-    ("delivery", ["delivery","deliver","shipping","ship","track","tracking","order status","where is my order"]),
-    ("payment",  ["payment","charge","charged","bill","billing","invoice","card","failed","declined"]),
-    ("account",  ["support","help","contact","agent","human","login","password","reset"]),
-    ("greeting", ["hello","hi ","hey","good morning","good evening","thanks","thank you"]),
-]
 # --- Conversation summary DTO ---
 class ConversationSummary(BaseModel):
     id: str
     customer_id: str
     last_text: str
     last_ts: datetime
+    message_count: int
+
+class SearchHit(BaseModel):
+    message_id: str
+    conversation_id: str
+    customer_id: str
+    sender: str
+    text: str
+    ts: datetime
+    label: Optional[str] = None
+    urgent: Optional[bool] = None
+    rank: float
+
+class SearchPage(BaseModel):
+    hits: List[SearchHit]
+    next_offset: Optional[int] = None
 
 @app.get("/api/conversations", response_model=List[ConversationSummary])
-def list_conversations(x_api_key: Optional[str] = Header(None)):
+async def list_conversations(
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+):
     # Optional: restrict to managers; remove next line if you want it public
     require_agent(x_api_key)
 
-    with get_session() as session:
-        # Pull all messages ordered by ts desc, then keep the first per conversation
-        rows = session.exec(
-            select(Message, Conversation)
-            .where(Message.conversation_id == Conversation.id)
-            .order_by(Message.ts.desc())
-        ).all()
-
-        seen = set()
-        out: List[ConversationSummary] = []
-        for m, c in rows:
-            if c.id in seen:
-                continue
-            seen.add(c.id)
-            out.append(ConversationSummary(
-                id=c.id,
-                customer_id=c.customer_id,
-                last_text=m.text,
-                last_ts=m.ts
-            ))
-        # newest first already, but you can sort again if needed
-        return out
-
-
-def simple_sentiment(text: str) -> dict:
-    t = text.lower()
-    pos = sum(1 for w in POS_WORDS if w in t)
-    neg = sum(1 for w in NEG_WORDS if w in t)
-    score = 0.0
-    if pos > neg: score = min(1.0, 0.25*(pos-neg))
-    elif neg > pos: score = max(-1.0, -0.25*(neg-pos))
-    label = "pos" if score > 0.05 else ("neg" if score < -0.05 else "neu")
-    urgent = any(tok in t for tok in URGENT_TOKENS) or (label=="neg" and neg>=2)
-    return {"score": score, "label": label, "urgent": urgent}
-
-def detect_intent(text: str) -> Optional[str]:
-    t = text.lower()
-    for intent, keys in INTENT_RULES:
-        if any(k in t for k in keys):
-            return intent
-    return None
+    async with get_async_session() as session:
+        # Newest first from the denormalized last_* fields over (last_ts, id);
+        # pass the last row's last_ts/id as before/before_id for the next page.
+        q = select(Conversation).where(Conversation.last_ts.is_not(None))
+        if before is not None:
+            before = rollups.to_utc_naive(before)
+            if before_id is None:
+                q = q.where(Conversation.last_ts < before)
+            else:
+                q = q.where(or_(Conversation.last_ts < before,
+                                and_(Conversation.last_ts == before, Conversation.id < before_id)))
+        with metrics.stage("conversations.query"):
+            rows = (await session.exec(
+                q.order_by(Conversation.last_ts.desc(), Conversation.id.desc()).limit(limit)
+            )).all()
+        metrics.add_rows(len(rows))
+        return [ConversationSummary(
+            id=c.id,
+            customer_id=c.customer_id,
+            last_text=c.last_text or "",
+            last_ts=c.last_ts,
+            message_count=c.message_count,
+        ) for c in rows]
+
 
 def match_faq(text: str, session) -> Optional[FAQModel]:
-    tokens = set(re.findall(r"[a-zA-Z]{4,}", text.lower()))
-    if not tokens: return None
-    best, best_score = None, 0
-    for faq in session.exec(select(FAQModel)).all():
-        q_tokens = set(re.findall(r"[a-zA-Z]{4,}", faq.question.lower()))
-        tag_tokens = set([t.lower() for t in (faq.tags or [])])
-        overlap = len(tokens & (q_tokens | tag_tokens))
-        if overlap > best_score:
-            best_score, best = overlap, faq
-    return best if best_score >= 1 else None
-
-def generate_reply(user_text: str, session) -> str:
+    with metrics.stage("faq_match"):
+        return faq_index.match(text, session)
+
+_NO_INTENT = object()
+
+def generate_reply(user_text: str, session, intent=_NO_INTENT) -> str:
     f = match_faq(user_text, session)
     if f: return f.answer
-    intent = detect_intent(user_text)
+    if intent is _NO_INTENT:
+        intent = detect_intent(user_text)
     if intent == "refund":
         return "I’m sorry about the trouble. I can help with refunds. Could you share your order ID?"
     if intent == "pricing":
@@ -147,96 +151,502 @@ def generate_reply(user_text: str, session) -> str:
         return "Hi! I’m here to help. What can I assist you with today?"
     return "Thanks for reaching out! I’m here to help. Could you give me a few more details?"
 
+# Reply decisions depend only on the lowercased text (what match_faq and
+# detect_intent read) and the FAQ set, so repeats skip the DB and matching.
+reply_cache = LRUCache(int(os.getenv("AURA_REPLY_CACHE_SIZE", "10000")),
+                       ttl=float(os.getenv("AURA_REPLY_CACHE_TTL", "300")))
+
+async def load_faq_index():
+    # the index only touches the DB when (re)loading, at most every reply TTL
+    # so FAQs added through other workers show up; matching is in memory
+    if not faq_index.fresh:
+        async with get_async_session() as session:
+            await session.run_sync(faq_index.rebuild)
+
+async def cached_reply(user_text: str) -> str:
+    key = (faq_index.version, user_text.lower())
+    reply = reply_cache.get(key)
+    if reply is None:
+        await load_faq_index()
+        reply = generate_reply(user_text, None)
+        reply_cache.put(key, reply)
+    return reply
+
+async def cached_replies(texts: List[str]) -> List[str]:
+    """cached_reply for a batch: misses share one lexicon pass."""
+    keys = [(faq_index.version, t.lower()) for t in texts]
+    found = {k: reply_cache.get(k) for k in set(keys)}
+    misses = [(k, t) for k, t in dict(zip(keys, texts)).items() if found[k] is None]
+    if misses:
+        await load_faq_index()
+        intents = [r["intent"] for r in analyze_batch([t for _, t in misses])]
+        for (k, t), intent in zip(misses, intents):
+            found[k] = generate_reply(t, None, intent)
+            reply_cache.put(k, found[k])
+    return [found[k] for k in keys]
+
 def require_agent(x_api_key: Optional[str]):
     if x_api_key != AGENT_API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
+def parse_since(since: Optional[str]) -> Optional[datetime]:
+    if not since: return None
+    try:
+        return rollups.to_utc_naive(datetime.fromisoformat(since))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Timestamps must be ISO-8601")
+
 # ---------- Routes ----------
 @app.get("/health")
 def health():
     return {"ok": True}
 
-@app.post("/api/chat/send", response_model=ChatReply)
-def chat_send(req: SendMessageReq):
-    from sqlmodel import select
-    with get_session() as session:
-        conv_id = req.conversation_id or str(uuid4())
-        conv = session.get(Conversation, conv_id)
-        if not conv:
-            conv = Conversation(id=conv_id, customer_id=req.customer_id)
-            session.add(conv); session.commit()
-
-        msg_id = str(uuid4())
-        m = Message(id=msg_id, conversation_id=conv_id, sender="customer", text=req.message)
-        session.add(m)
-
-        sent = simple_sentiment(req.message)
-        s = Sentiment(id=str(uuid4()), message_id=msg_id, score=sent["score"], label=sent["label"], urgent=sent["urgent"])
-        session.add(s)
+def write_turn(session, conv_id: str, customer_id: str, m: Message, sent: dict, reply_text: str) -> list:
+    """Persist one chat turn: conversation (if new), customer message, sentiment, bot reply.
 
-        reply_text = generate_reply(req.message, session)
+    Returns the live-feed events describing the turn.
+    """
+    with metrics.stage("conversation_lookup"):
+        conv = session.get(Conversation, conv_id)
+    if not conv:
+        conv = Conversation(id=conv_id, customer_id=customer_id)
+        session.add(conv)
+    session.add(m)
+    session.add(Sentiment(id=new_id(), message_id=m.id, score=sent["score"], label=sent["label"], urgent=sent["urgent"]))
+    rollups.record_messages(session, [(conv.customer_id, m.ts, sent["label"], sent["urgent"], sent["score"])])
+    terms.record(session, [(m.ts, m.text)])
+
+    bot = Message(id=new_id(), conversation_id=conv_id, sender="bot", text=reply_text)
+    session.add(bot)
+    rollups.touch_conversation(conv, bot, 2)
+
+    churn = None
+    if sent["label"] == "neg" and sent["urgent"]:
+        churn = rollups.customer_churn(session, conv.customer_id)
+    return live.turn_events(conv_id, conv.customer_id, m.id, m.text, m.ts, sent, churn)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition: request/stage latency, rows loaded, DB pool."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    pools = {"sync": db.engine, "async": db.async_engine.sync_engine}
+    return PlainTextResponse(metrics.render(pools), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats/cache")
+def cache_stats(x_api_key: Optional[str] = Header(None)):
+    require_agent(x_api_key)
+    scorer = scoring.get_scorer()
+    return {
+        "reply": {**reply_cache.stats(), "faq_version": faq_index.version},
+        "sentiment": scorer.cache.stats() if hasattr(scorer, "cache") else None,
+    }
+
+@app.get("/api/stats/admission")
+def admission_stats(x_api_key: Optional[str] = Header(None)):
+    require_agent(x_api_key)
+    return admission.stats()
 
-        bot_id = str(uuid4())
-        session.add(Message(id=bot_id, conversation_id=conv_id, sender="bot", text=reply_text))
-        session.commit()
+def too_many(e: admission.Rejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=f"Too many requests ({e.reason})",
+                         headers={"Retry-After": e.retry_after_header})
 
-        return ChatReply(
+@app.post("/api/chat/send", response_model=ChatReply)
+async def chat_send(req: SendMessageReq, x_api_key: Optional[str] = Header(None)):
+    # lexicon urgency is cheap enough to decide priority before doing any work
+    urgent = simple_sentiment(req.message)["urgent"]
+    try:
+        admission.check_rate(req.customer_id, x_api_key)
+        with admission.admit(urgent):
+            return await send_one(req)
+    except admission.Rejected as e:
+        raise too_many(e)
+
+async def send_one(req: SendMessageReq) -> ChatReply:
+    conv_id = req.conversation_id or new_id()
+    msg_id = new_id()
+    m = Message(id=msg_id, conversation_id=conv_id, sender="customer", text=req.message)
+    with metrics.stage("sentiment"):
+        sent = await scoring.get_scorer().score_async(req.message)
+    with metrics.stage("reply"):
+        reply_text = await cached_reply(req.message)
+
+    # one transaction per turn (or one shared commit per batch under group commit);
+    # live events go out once it commits, also under async durability
+    with metrics.stage("persist"):
+        await writer.run_write_async(
+            lambda session: write_turn(session, conv_id, req.customer_id, m, sent, reply_text),
+            on_commit=live.broker.publish)
+
+    return ChatReply(
+        reply=reply_text,
+        sentiment={"score": sent["score"], "label": sent["label"]},
+        urgent=sent["urgent"],
+        conversation_id=conv_id,
+        message_id=msg_id,
+    )
+
+def write_turns(session, turns: List[tuple]) -> list:
+    """write_turn for a batch of (conv_id, customer_id, message, sentiment, reply) tuples:
+    one conversation lookup, bulk adds, one rollup update."""
+    conv_ids = {t[0] for t in turns}
+    with metrics.stage("conversation_lookup"):
+        convs = {c.id: c for c in session.exec(select(Conversation).where(Conversation.id.in_(conv_ids)))}
+    last: Dict[str, Message] = {}
+    added: Dict[str, int] = {}
+    scored = []
+    for conv_id, customer_id, m, sent, reply_text in turns:
+        conv = convs.get(conv_id)
+        if conv is None:
+            conv = convs[conv_id] = Conversation(id=conv_id, customer_id=customer_id)
+            session.add(conv)
+        bot = Message(id=new_id(), conversation_id=conv_id, sender="bot", text=reply_text)
+        session.add_all([m, Sentiment(id=new_id(), message_id=m.id, score=sent["score"], label=sent["label"],
+                                      urgent=sent["urgent"]), bot])
+        scored.append((conv.customer_id, m.ts, sent["label"], sent["urgent"], sent["score"]))
+        last[conv_id] = bot
+        added[conv_id] = added.get(conv_id, 0) + 2
+    # one inbox update per conversation, however many of its turns are in the batch
+    for conv_id, bot in last.items():
+        rollups.touch_conversation(convs[conv_id], bot, added[conv_id])
+    rollups.record_messages(session, scored)
+    terms.record(session, [(t[2].ts, t[2].text) for t in turns])
+
+    risky = {convs[t[0]].customer_id for t in turns if t[3]["label"] == "neg" and t[3]["urgent"]}
+    churn = rollups.churn_for(session, risky) if risky else {}
+    events = []
+    for conv_id, _, m, sent, _ in turns:
+        cid = convs[conv_id].customer_id
+        events.extend(live.turn_events(conv_id, cid, m.id, m.text, m.ts, sent, churn.get(cid)))
+    return events
+
+@app.post("/api/chat/send_batch", response_model=List[BatchItemResult])
+async def chat_send_batch(batch: BatchSendReq, x_api_key: Optional[str] = Header(None)):
+    """Send many chat messages at once (channel gateways); results come back in item order.
+
+    Items that fail validation or exceed their customer's or the API key's
+    rate limit are reported individually. The rest are scored and written in one transaction;
+    if that fails, they are retried one turn at a time so a single bad item
+    can't sink the batch.
+    """
+    results: List[Optional[BatchItemResult]] = [None] * len(batch.items)
+    reqs = []
+    for i, raw in enumerate(batch.items):
+        try:
+            reqs.append((i, SendMessageReq.model_validate(raw)))
+        except ValidationError as e:
+            results[i] = BatchItemResult(index=i, ok=False, error=f"invalid item: {e.errors()[0]['msg']}")
+    try:
+        granted = admission.grant_key(x_api_key, len(reqs))
+        with admission.admit(any(simple_sentiment(r.message)["urgent"] for _, r in reqs)):
+            admitted = []
+            for k, (i, req) in enumerate(reqs):
+                if k >= granted:
+                    results[i] = BatchItemResult(index=i, ok=False, error="rate limited (api_key)")
+                    continue
+                try:
+                    admission.check_rate(req.customer_id, None)
+                    admitted.append((i, req))
+                except admission.Rejected as e:
+                    results[i] = BatchItemResult(index=i, ok=False, error=f"rate limited ({e.reason})")
+            # the key only pays for items its customers' limits let through
+            admission.refund_key(x_api_key, granted - len(admitted))
+            await send_many(admitted, results)
+    except admission.Rejected as e:
+        raise too_many(e)
+    return results
+
+async def send_many(reqs: List[tuple], results: List[Optional[BatchItemResult]]):
+    if not reqs:
+        return
+    texts = [r.message for _, r in reqs]
+    with metrics.stage("sentiment"):
+        # CPU-bound for large batches; keep it off the event loop
+        sents = await run_in_threadpool(scoring.get_scorer().score_batch, texts)
+    with metrics.stage("reply"):
+        replies = await cached_replies(texts)
+    turns, msg_ids = [], []
+    for (_, req), sent, reply_text in zip(reqs, sents, replies):
+        conv_id = req.conversation_id or new_id()
+        msg_ids.append(new_id())
+        m = Message(id=msg_ids[-1], conversation_id=conv_id, sender="customer", text=req.message)
+        turns.append((conv_id, req.customer_id, m, sent, reply_text))
+
+    errors: Dict[int, str] = {}
+    with metrics.stage("persist"):
+        try:
+            await writer.run_write_async(lambda session: write_turns(session, turns), on_commit=live.broker.publish)
+        except Exception:
+            for (i, _), t in zip(reqs, turns):
+                try:
+                    await writer.run_write_async(lambda session, t=t: write_turn(session, *t),
+                                                 on_commit=live.broker.publish)
+                except Exception as e:
+                    errors[i] = f"{type(e).__name__}: {e}"
+
+    for (i, _), msg_id, (conv_id, _, _, sent, reply_text) in zip(reqs, msg_ids, turns):
+        if i in errors:
+            results[i] = BatchItemResult(index=i, ok=False, error=errors[i])
+            continue
+        results[i] = BatchItemResult(index=i, ok=True, result=ChatReply(
             reply=reply_text,
             sentiment={"score": sent["score"], "label": sent["label"]},
             urgent=sent["urgent"],
             conversation_id=conv_id,
             message_id=msg_id,
-        )
+        ))
 
 @app.get("/api/chat/history", response_model=List[MessageOut])
-def chat_history(conversation_id: str):
-    with get_session() as session:
-        rows = session.exec(
-            select(Message).where(Message.conversation_id==conversation_id).order_by(Message.ts.asc())
-        ).all()
-        return [MessageOut(id=r.id, conversation_id=r.conversation_id, sender=r.sender, text=r.text, ts=r.ts) for r in rows]
+async def chat_history(
+    conversation_id: str,
+    response: Response,
+    after: Optional[datetime] = None,
+    after_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    if_none_match: Optional[str] = Header(None),
+):
+    async with get_async_session() as session:
+        # the conversation's message_count/last_ts change on every write, so
+        # they version the history without touching the message rows
+        conv = await session.get(Conversation, conversation_id)
+        entries = None
+        if conv is not None:
+            etag = f'W/"{conv.message_count}-{conv.last_ts.isoformat() if conv.last_ts else ""}"'
+        else:
+            # fully archived: its (immutable) archive entries version it instead
+            entries = (await session.exec(archive.entries_for(conversation_id))).all()
+            etag = f'W/"a{len(entries)}-{entries[-1].last_ts.isoformat()}"' if entries else None
+        if etag is not None:
+            if if_none_match == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            response.headers["ETag"] = etag
+        if entries is None:
+            entries = (await session.exec(archive.entries_for(conversation_id))).all()
+
+        # incremental fetch: pass the last seen ts/id as after/after_id
+        q = select(Message).where(Message.conversation_id==conversation_id)
+        if after is not None:
+            after = rollups.to_utc_naive(after)
+            if after_id is None:
+                q = q.where(Message.ts > after)
+            else:
+                q = q.where(or_(Message.ts > after, and_(Message.ts == after, Message.id > after_id)))
+        q = q.order_by(Message.ts.asc(), Message.id.asc())
+        if limit is not None:
+            q = q.limit(limit)
+        rows = [MessageOut(id=r.id, conversation_id=r.conversation_id, sender=r.sender, text=r.text, ts=r.ts)
+                for r in (await session.exec(q)).all()]
+
+    # archived messages come from the cold tier's partition files
+    if entries:
+        old = [MessageOut(id=d["id"], conversation_id=conversation_id, sender=d["sender"], text=d["text"], ts=d["ts"])
+               for d in await run_in_threadpool(archive.read_messages, entries, after, after_id)]
+        rows = sorted(old + rows, key=lambda r: (r.ts, r.id))[:limit]
+    metrics.add_rows(len(rows))
+    return rows
 
 @app.get("/api/analytics/summary")
-def analytics_summary(since: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
+async def analytics_summary(since: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
+    require_agent(x_api_key)
+    since_ts = parse_since(since)
+    async with get_async_session() as session:
+        # counters come from rollups kept current by chat_send; `since` is
+        # served from hourly buckets (rounded down to the hour)
+        with metrics.stage("summary.rollups"):
+            stats = await session.run_sync(rollups.read_summary, since_ts)
+
+        # top issues from term counts tokenized on write (see terms.py)
+        with metrics.stage("summary.top_issues"):
+            issues = await session.run_sync(terms.top_terms, since_ts)
+
+    return {
+        "volume": stats["volume"],
+        "sentiment_trend": {"pos": stats["pos"], "neg": stats["neg"], "neu": stats["neu"]},
+        "top_issues": issues,
+        # riskiest customers by time-decayed urgent-negative count
+        "churn": {"by_customer": stats["churn"]},
+    }
+
+
+@app.get("/api/search", response_model=SearchPage)
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=200),
+    sender: Optional[str] = Query(None, pattern="^(customer|bot|agent)$"),
+    label: Optional[str] = Query(None, pattern="^(pos|neg|neu)$"),
+    urgent: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    x_api_key: Optional[str] = Header(None),
+):
+    """Full-text search over message text, best match first (see search.py)."""
     require_agent(x_api_key)
     with get_session() as session:
-        # Get all customer messages once; reuse for total + tokens
-        customer_msgs = session.exec(
-            select(Message).where(Message.sender == "customer")
-        ).all()
-        total_count = len(customer_msgs)
-
-        # sentiment counts from Sentiment table
-        labels = {"pos": 0, "neg": 0, "neu": 0}
-        for s in session.exec(select(Sentiment)).all():
-            labels[s.label] = labels.get(s.label, 0) + 1
-
-        # top issues from customer messages
-        texts = [m.text.lower() for m in customer_msgs]
-        tokens = [t for txt in texts for t in re.findall(r"[a-zA-Z]{4,}", txt)]
-        stop = {"please", "thank", "thanks", "order", "issue", "could", "would"}
-        keywords = [t for t in tokens if t not in stop]
-        top_issues = Counter(keywords).most_common(5)
-
-        # churn heuristic: urgent negative per customer
-        urgent_neg_by_customer = defaultdict(int)
-        q = session.exec(
-            select(Message, Sentiment, Conversation)
-            .where(Message.id == Sentiment.message_id)
-            .where(Message.sender == "customer")
-            .where(Message.conversation_id == Conversation.id)
-        ).all()
-        for m, s, c in q:
-            if s.label == "neg" and s.urgent:
-                urgent_neg_by_customer[c.customer_id] += 1
-        churn = [{"customer_id": cid, "risk": min(1.0, 0.3 * n)} for cid, n in urgent_neg_by_customer.items()]
-
-        return {
-            "volume": total_count,
-            "sentiment_trend": {"pos": labels["pos"], "neg": labels["neg"], "neu": labels["neu"]},
-            "top_issues": top_issues,
-            "churn": {"by_customer": churn},
-        }
+        try:
+            with metrics.stage("search.query"):
+                hits = search.search(session, q, sender, label, urgent, limit + 1, offset)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Query must contain a search term")
+    metrics.add_rows(len(hits))
+    more = len(hits) > limit
+    return SearchPage(hits=hits[:limit], next_offset=offset + limit if more else None)
+
+
+@app.get("/api/analytics/timeseries")
+async def analytics_timeseries(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    bucket: str = Query("hour", pattern="^(hour|day|week)$"),
+    percentiles: bool = False,
+    x_api_key: Optional[str] = Header(None),
+):
+    """Per-bucket volume, label mix, mean score and urgent rate over [since, until).
+
+    Defaults to the last 7 days. `percentiles=true` adds p50/p90/p99 of the
+    sentiment score per bucket (reads the raw scores for the range).
+    """
+    require_agent(x_api_key)
+    until_ts = parse_since(until) or datetime.utcnow()
+    # buckets are whole hours, so the range starts on one
+    since_ts = rollups.bucket_of(parse_since(since) or until_ts - timedelta(days=7))
+    if since_ts >= until_ts:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if until_ts - since_ts > timedelta(days=3 * 366):
+        raise HTTPException(status_code=400, detail="Range is limited to 3 years")
+    async with get_async_session() as session:
+        with metrics.stage("timeseries.buckets"):
+            points = await session.run_sync(timeseries.series, since_ts, until_ts, bucket)
+        if percentiles:
+            with metrics.stage("timeseries.percentiles"):
+                pct = await session.run_sync(timeseries.score_percentiles, since_ts, until_ts, bucket)
+            for p in points:
+                p.update(pct.get(p["ts"], {}))
+    metrics.add_rows(len(points))
+    return {"bucket": bucket, "since": since_ts, "until": until_ts, "series": points}
+
+
+@app.get("/api/analytics/churn")
+async def analytics_churn(limit: int = Query(20, ge=1, le=500), x_api_key: Optional[str] = Header(None)):
+    """Top-K customers by decayed churn risk, read from the log_mass index."""
+    require_agent(x_api_key)
+    async with get_async_session() as session:
+        with metrics.stage("churn.top_k"):
+            rows = await session.run_sync(rollups.top_churn, limit)
+    metrics.add_rows(len(rows))
+    return {"by_customer": rows, "half_life_days": rollups.CHURN_HALF_LIFE_S / 86400}
+
+@app.get("/api/analytics/issues")
+async def analytics_issues(
+    since: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=200),
+    ngram: int = Query(1, ge=1, le=2),
+    x_api_key: Optional[str] = Header(None),
+):
+    """Most frequent customer-message words (ngram=1) or word pairs (ngram=2) since `since`."""
+    require_agent(x_api_key)
+    since_ts = parse_since(since)
+    async with get_async_session() as session:
+        with metrics.stage("issues.query"):
+            rows = await session.run_sync(terms.top_terms, since_ts, limit, ngram)
+    metrics.add_rows(len(rows))
+    return {"issues": [{"term": t, "count": n} for t, n in rows]}
+
+@app.get("/api/analytics/trending")
+async def analytics_trending(
+    window_hours: int = Query(24, ge=1, le=24 * 30),
+    baseline_days: int = Query(7, ge=1, le=365),
+    min_count: int = Query(5, ge=1),
+    min_ratio: float = Query(3.0, ge=1.0),
+    limit: int = Query(20, ge=1, le=200),
+    ngram: int = Query(1, ge=1, le=2),
+    x_api_key: Optional[str] = Header(None),
+):
+    """Terms whose rate over the last window_hours rose at least min_ratio-fold over the
+    preceding baseline_days, from the stored term counts (see terms.trending)."""
+    require_agent(x_api_key)
+    async with get_async_session() as session:
+        with metrics.stage("trending.query"):
+            rows = await session.run_sync(lambda s: terms.trending(
+                s, window=timedelta(hours=window_hours), baseline=timedelta(days=baseline_days),
+                min_count=min_count, min_ratio=min_ratio, limit=limit, ngram=ngram))
+    metrics.add_rows(len(rows))
+    return {"window_hours": window_hours, "baseline_days": baseline_days, "trending": rows}
+
+
+@app.get("/api/analytics/stream")
+async def analytics_stream(request: Request, api_key: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
+    """Server-Sent Events feed for the dashboard.
+
+    Starts with a `snapshot` of the summary counters, then pushes `delta`,
+    `urgent` and `churn` events as chat turns are written (`resync` means
+    refetch the summary). EventSource can't send headers, so the key may
+    also be passed as ?api_key=.
+    """
+    require_agent(x_api_key or api_key)
+    sub = live.broker.subscribe()
+
+    async def frames():
+        try:
+            async with get_async_session() as session:
+                snapshot = await session.run_sync(rollups.read_summary)
+            yield live.encode([{"type": "snapshot", **snapshot}])
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(sub.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            live.broker.unsubscribe(sub)
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/import/ndjson")
+async def import_ndjson(request: Request, job_id: Optional[str] = None, x_api_key: Optional[str] = Header(None)):
+    """Bulk-load historical messages from a streamed NDJSON body (see bulk.py for the line format)."""
+    require_agent(x_api_key)
+    job = bulk.start_job(job_id)
+    importer = bulk.Importer(job)
+    try:
+        async for line in bulk.iter_lines(request.stream()):
+            importer.feed(line)
+            if importer.full:
+                await run_in_threadpool(importer.flush)
+        await run_in_threadpool(importer.flush)
+    finally:
+        job.finished = time.time()
+        live.broker.publish([{"type": "resync"}])
+    return job.snapshot()
+
+@app.get("/api/import/{job_id}")
+def import_status(job_id: str, x_api_key: Optional[str] = Header(None)):
+    require_agent(x_api_key)
+    job = bulk.JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown import job")
+    return job.snapshot()
+
+@app.post("/api/archive/run")
+def archive_run(older_than_days: Optional[float] = Query(None, ge=0), x_api_key: Optional[str] = Header(None)):
+    """Move conversations idle for longer than older_than_days (default
+    AURA_ARCHIVE_AFTER_DAYS) to the archive tier; see archive.py."""
+    require_agent(x_api_key)
+    return archive.run(older_than_days)
+
+
+@app.get("/api/export")
+def export_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    customer_id: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+):
+    """Stream messages with their sentiment and customer id as NDJSON or CSV."""
+    require_agent(x_api_key)
+    q = bulk.export_query(parse_since(since), parse_since(until), customer_id)
+    media = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(bulk.iter_export(q, format), media_type=media,
+                             headers={"Content-Disposition": f"attachment; filename=aura-messages.{format}"})
 
 
 @app.post("/api/faq", response_model=FAQItem)
@@ -245,6 +655,7 @@ def faq_create(item: FAQItem, x_api_key: Optional[str] = Header(None)):
     with get_session() as session:
         faq = FAQModel(id=item.id, question=item.question, answer=item.answer, tags=item.tags or [])
         session.add(faq); session.commit()
+        faq_index.add(faq)
         return item
 
 @app.get("/api/faq", response_model=List[FAQItem])
@@ -257,8 +668,18 @@ def faq_list(x_api_key: Optional[str] = Header(None)):
 # ---------- Startup: init DB + seed ----------
 @app.on_event("startup")
 def on_startup():
-    init_db()
+    added = init_db()
+    search.install(db.engine)
+    writer.start_from_env()
     with get_session() as session:
+        # one-off backfills for databases created before these columns/tables
+        if ("conversation", "last_ts") in added:
+            rollups.backfill_conversations(session); session.commit()
+        if rollups.needs_backfill(session, added):
+            rollups.rebuild(session); session.commit()
+        if terms.needs_backfill(session):
+            terms.rebuild(session); session.commit()
+
         # seed FAQs once
         if session.exec(select(FAQModel)).first() is None:
             session.add_all([
@@ -272,7 +693,8 @@ def on_startup():
             session.commit()
 
         # seed sample messages once
-        if session.exec(select(Message)).first() is None:
+        if (session.exec(select(Message)).first() is None
+                and session.exec(select(ArchivedConversation.id)).first() is None):
             print("🌱 Seeding demo data...")
             seeds = [
                 ("cust_001","I am angry my order is late and want a refund asap"),
@@ -283,14 +705,30 @@ def on_startup():
                 ("cust_006","Great experience overall"),
                 ("cust_007","Hate that my delivery was delayed twice"),
             ]
+            scored, said = [], []
             for cid, text in seeds:
-                conv_id = str(uuid4())
-                session.add(Conversation(id=conv_id, customer_id=cid))
-                msg_id = str(uuid4())
-                session.add(Message(id=msg_id, conversation_id=conv_id, sender="customer", text=text))
-                s = simple_sentiment(text)
-                session.add(Sentiment(id=str(uuid4()), message_id=msg_id, score=s["score"], label=s["label"], urgent=s["urgent"]))
-                session.add(Message(id=str(uuid4()), conversation_id=conv_id, sender="bot", text="Thanks! Noted."))
+                conv_id = new_id()
+                conv = Conversation(id=conv_id, customer_id=cid)
+                session.add(conv)
+                msg_id = new_id()
+                m = Message(id=msg_id, conversation_id=conv_id, sender="customer", text=text)
+                session.add(m)
+                s = scoring.get_scorer().score(text)
+                session.add(Sentiment(id=new_id(), message_id=msg_id, score=s["score"], label=s["label"], urgent=s["urgent"]))
+                scored.append((cid, m.ts, s["label"], s["urgent"], s["score"]))
+                said.append((m.ts, text))
+                bot = Message(id=new_id(), conversation_id=conv_id, sender="bot", text="Thanks! Noted.")
+                session.add(bot)
+                rollups.touch_conversation(conv, bot, 2)
+            rollups.record_messages(session, scored)
+            terms.record(session, said)
             session.commit()
             print("✅ Seed complete.")
 
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    writer.stop()
+    scoring.shutdown()
+    archive.partitions.close()
+    await db.async_engine.dispose()
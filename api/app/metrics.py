@@ -0,0 +1,205 @@
+import bisect
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+log = logging.getLogger("aura.metrics")
+
+# ---------- Prometheus-style metrics ----------
+# A tiny in-process registry rendered in the Prometheus text format on /metrics.
+# AURA_METRICS=0 turns everything off: stage() hands back a shared no-op
+# context manager and the timing middleware is not installed.
+#   AURA_SLOW_REQUEST_MS - log a per-stage breakdown for requests slower than this
+#   AURA_SLOW_SAMPLE     - fraction of slow requests to log (default 1.0)
+
+ENABLED = os.getenv("AURA_METRICS", "1") == "1"
+SLOW_MS = float(os.getenv("AURA_SLOW_REQUEST_MS", "0"))
+SLOW_SAMPLE = float(os.getenv("AURA_SLOW_SAMPLE", "1.0"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            v = self._values.get(labels)
+            if v is None:
+                v = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            v[0][i] += 1
+            v[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+        out = []
+        for k, counts, total in items:
+            cum = 0
+            for bound, c in zip((*self.buckets, "+Inf"), counts):
+                cum += c
+                le = 'le="%s"' % bound
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {cum}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {total}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {cum}")
+        return out
+
+
+REGISTRY: List = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+REQUESTS = register(Counter("aura_http_requests_total", "HTTP requests handled.", ("method", "route", "status")))
+REQUEST_SECONDS = register(Histogram("aura_http_request_duration_seconds", "End-to-end request latency.",
+                                     ("method", "route")))
+STAGE_SECONDS = register(Histogram("aura_stage_duration_seconds", "Time spent in instrumented hot-path stages.",
+                                   ("stage",)))
+ROWS_LOADED = register(Histogram("aura_rows_loaded", "Database rows loaded per request.", ("route",),
+                                 buckets=ROW_BUCKETS))
+SLOW_REQUESTS = register(Counter("aura_slow_requests_total", "Requests over AURA_SLOW_REQUEST_MS.", ("route",)))
+
+
+# ---------- Per-request accounting ----------
+class RequestStats:
+    __slots__ = ("stages", "rows")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.rows = 0
+
+
+_current: "contextvars.ContextVar[Optional[RequestStats]]" = contextvars.ContextVar("aura_request", default=None)
+_NOOP = nullcontext()
+
+
+@contextmanager
+def _timed(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, name)
+        req = _current.get()
+        if req is not None:
+            req.stages[name] = req.stages.get(name, 0.0) + dt
+
+
+def stage(name: str):
+    """Time a hot-path stage: `with metrics.stage("score"): ...`."""
+    return _timed(name) if ENABLED else _NOOP
+
+
+def add_rows(n: int):
+    """Count rows loaded by the current request."""
+    req = _current.get() if ENABLED else None
+    if req is not None:
+        req.rows += n
+
+
+class TimingMiddleware:
+    """ASGI middleware recording latency per route and, optionally, sampling slow requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        req = RequestStats()
+        token = _current.set(req)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            _current.reset(token)
+            endpoint = scope.get("endpoint")
+            # endpoint names keep the label set bounded (raw paths embed ids)
+            route = getattr(endpoint, "__name__", "unmatched")
+            REQUESTS.inc(scope["method"], route, str(status[0]))
+            REQUEST_SECONDS.observe(dt, scope["method"], route)
+            ROWS_LOADED.observe(req.rows, route)
+            if SLOW_MS and dt * 1000 >= SLOW_MS:
+                SLOW_REQUESTS.inc(route)
+                if random.random() < SLOW_SAMPLE:
+                    breakdown = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in req.stages.items())
+                    log.warning("slow request %s %s %.1fms rows=%d %s",
+                                scope["method"], scope["path"], dt * 1000, req.rows, breakdown)
+
+
+def pool_stats(engines: Dict[str, object]) -> List[str]:
+    """Connection pool gauges for each named engine, labelled engine="<name>"."""
+    out = []
+    for name, attr in (("size", "size"), ("checked_in", "checkedin"),
+                       ("checked_out", "checkedout"), ("overflow", "overflow")):
+        samples = []
+        for label, engine in engines.items():
+            fn = getattr(engine.pool, attr, None)
+            if fn is not None:
+                samples.append(f"aura_db_pool_{name}{_labels(('engine',), (label,))} {fn()}")
+        if samples:
+            out.append(f"# TYPE aura_db_pool_{name} gauge")
+            out.extend(samples)
+    return out
+
+
+def render(engines: Optional[Dict[str, object]] = None) -> str:
+    lines = []
+    for m in REGISTRY:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.samples())
+    if engines:
+        lines.extend(pool_stats(engines))
+    return "\n".join(lines) + "\n"
@@ -1,17 +1,49 @@
 # D:\Projects\aura\api\app\models.py
 from typing import Optional, List
 from datetime import datetime
-from sqlmodel import SQLModel, Field, Relationship, Column, JSON
+from sqlmodel import SQLModel, Field, Relationship, Column, JSON, Index
+import os
+import time
+
+# ---------- Ids ----------
+# UUIDv7 strings: a 48-bit millisecond timestamp first, then random bits. New
+# rows land at the right edge of the primary-key and foreign-key indexes
+# instead of scattering across them, and the ids still look like UUIDs (rows
+# created before the switch keep their UUID4 ids; both sort as plain text).
+_VARIANT = {c: "89ab"[int(c, 16) & 3] for c in "0123456789abcdef"}
+
+def new_ids(n: int) -> List[str]:
+    """n UUIDv7 strings from a single urandom call (per-row generation is a hot spot)."""
+    t = f"{time.time_ns() // 1_000_000:012x}"
+    prefix = f"{t[:8]}-{t[8:]}-7"
+    h = os.urandom(10 * n).hex()
+    return [f"{prefix}{h[i:i+3]}-{_VARIANT[h[i+3]]}{h[i+4:i+7]}-{h[i+7:i+19]}" for i in range(0, 20 * n, 20)]
+
+def new_id() -> str:
+    return new_ids(1)[0]
 
 class Conversation(SQLModel, table=True):
-    id: str = Field(primary_key=True, index=True)
-    customer_id: str = Field(index=True)
+    __table_args__ = (
+        Index("ix_conversation_last_ts_id", "last_ts", "id"),
+        Index("ix_conversation_customer_id_id", "customer_id", "id"),
+    )
+    id: str = Field(default_factory=new_id, primary_key=True)
+    customer_id: str  # indexed by ix_conversation_customer_id_id
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # denormalized from the newest message; kept current on every write
+    last_text: Optional[str] = None
+    last_ts: Optional[datetime] = None
+    message_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     messages: List["Message"] = Relationship(back_populates="conversation")
 
 class Message(SQLModel, table=True):
-    id: str = Field(primary_key=True, index=True)
-    conversation_id: str = Field(foreign_key="conversation.id", index=True)
+    __table_args__ = (
+        Index("ix_message_conversation_id_ts", "conversation_id", "ts"),
+        Index("ix_message_ts", "ts"),
+        Index("ix_message_sender_ts", "sender", "ts"),
+    )
+    id: str = Field(default_factory=new_id, primary_key=True)
+    conversation_id: str = Field(foreign_key="conversation.id")  # indexed by ix_message_conversation_id_ts
     sender: str
     text: str
     ts: datetime = Field(default_factory=datetime.utcnow)
@@ -19,7 +51,7 @@ class Message(SQLModel, table=True):
     sentiment: Optional["Sentiment"] = Relationship(back_populates="message")
 
 class Sentiment(SQLModel, table=True):
-    id: str = Field(primary_key=True, index=True)
+    id: str = Field(default_factory=new_id, primary_key=True)
     message_id: str = Field(foreign_key="message.id", unique=True)
     score: float
     label: str
@@ -27,7 +59,60 @@ class Sentiment(SQLModel, table=True):
     message: Optional[Message] = Relationship(back_populates="sentiment")
 
 class FAQ(SQLModel, table=True):
-    id: str = Field(primary_key=True, index=True)
+    id: str = Field(primary_key=True)
     question: str
     answer: str
     tags: List[str] = Field(sa_column=Column(JSON))
+
+# ---------- Analytics rollups (maintained on write, see rollups.py) ----------
+class StatsTotal(SQLModel, table=True):
+    id: int = Field(default=1, primary_key=True)
+    volume: int = 0
+    pos: int = 0
+    neg: int = 0
+    neu: int = 0
+    urgent: int = 0
+    score_sum: float = Field(default=0.0, sa_column_kwargs={"server_default": "0"})
+
+class StatsBucket(SQLModel, table=True):
+    bucket: datetime = Field(primary_key=True)  # UTC hour start
+    volume: int = 0
+    pos: int = 0
+    neg: int = 0
+    neu: int = 0
+    urgent: int = 0
+    score_sum: float = Field(default=0.0, sa_column_kwargs={"server_default": "0"})
+
+class CustomerRisk(SQLModel, table=True):
+    __table_args__ = (Index("ix_customerrisk_log_mass", "log_mass"),)
+    customer_id: str = Field(primary_key=True)
+    urgent_neg: int = 0
+    # log of the forward-decayed urgent-negative count, see rollups.churn_log_weight
+    log_mass: float = Field(default=0.0, sa_column_kwargs={"server_default": "0"})
+
+# ---------- Archive index (see archive.py) ----------
+class ArchivedConversation(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    conversation_id: str = Field(index=True)
+    customer_id: str = Field(index=True)
+    # one zlib-compressed NDJSON block at [byte_offset, byte_offset + byte_length)
+    # of the month partition file messages-<partition>.ndjson.z
+    partition: str
+    byte_offset: int
+    byte_length: int
+    message_count: int
+    first_ts: datetime
+    last_ts: datetime
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+# ---------- Term counts (see terms.py) ----------
+class TermTotal(SQLModel, table=True):
+    ngram: int = Field(primary_key=True)  # 1 = word, 2 = word pair
+    term: str = Field(primary_key=True)
+    count: int = 0
+
+class TermBucket(SQLModel, table=True):
+    bucket: datetime = Field(primary_key=True)  # UTC hour start
+    ngram: int = Field(primary_key=True)
+    term: str = Field(primary_key=True)
+    count: int = 0
@@ -0,0 +1,255 @@
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, inspect, literal_column, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import select
+
+from .models import ArchivedConversation, Conversation, Message, Sentiment, StatsTotal, StatsBucket, CustomerRisk
+from . import archive
+from .db import logaddexp
+
+COUNTERS = ("volume", "pos", "neg", "neu", "urgent", "score_sum")
+
+# (customer_id, ts, label, urgent, score) for one scored customer message
+ScoredMessage = Tuple[str, datetime, str, bool, float]
+
+
+def churn_risk(urgent_neg: float) -> float:
+    return min(1.0, 0.3 * urgent_neg)
+
+
+# ---------- Time-decayed churn ----------
+# Forward decay: an urgent negative message at ts has weight 2**((ts - EPOCH) / half_life),
+# a customer's mass is the sum of their weights, and the decayed count at `now`
+# is mass * 2**(-(now - EPOCH) / half_life). Since the scale factor is shared by
+# everyone, ORDER BY mass is the current risk order at any time (indexed top-K).
+# The weights grow without bound (past 2**1024 a float overflows: 2063 with the
+# 14-day default, weeks out with a 1-day half-life), so CustomerRisk stores
+# log_mass and upserts combine it with log-sum-exp; the log weight grows
+# linearly with time and never overflows.
+CHURN_EPOCH = datetime(2024, 1, 1)
+
+
+def _half_life_s() -> float:
+    days = float(os.getenv("AURA_CHURN_HALF_LIFE_DAYS", "14"))
+    if not 0 < days < math.inf:
+        raise ValueError(f"AURA_CHURN_HALF_LIFE_DAYS must be a positive number of days, got {days!r}")
+    return days * 86400
+
+
+CHURN_HALF_LIFE_S = _half_life_s()
+
+
+def churn_log_weight(ts: datetime) -> float:
+    return (ts - CHURN_EPOCH).total_seconds() / CHURN_HALF_LIFE_S * math.log(2)
+
+
+def decayed(log_mass: Optional[float], now: Optional[datetime] = None) -> float:
+    if log_mass is None: return 0.0
+    return math.exp(log_mass - churn_log_weight(now or datetime.utcnow()))
+
+
+def log_add_sql(dialect: str, a, b):
+    """SQL for log(exp(a) + exp(b)); SQLite gets db.logaddexp as a connection function."""
+    if dialect == "postgresql":
+        hi, lo = func.greatest(a, b), func.least(a, b)
+        # exp() raises on underflow in Postgres
+        return hi + func.ln(literal_column("1") + func.exp(func.greatest(lo - hi, literal_column("-700"))))
+    return func.logaddexp(a, b)
+
+
+def customer_churn(session, customer_id: str) -> float:
+    return churn_for(session, [customer_id])[customer_id]
+
+
+def churn_for(session, customer_ids: Iterable[str]) -> Dict[str, float]:
+    """Current decayed risk for each customer, in one query."""
+    ids = set(customer_ids)
+    # column query, so stale identity-mapped rows can't be returned
+    rows = session.exec(
+        select(CustomerRisk.customer_id, CustomerRisk.log_mass).where(CustomerRisk.customer_id.in_(ids))
+    ).all()
+    mass = dict(rows)
+    return {c: round(churn_risk(decayed(mass.get(c))), 4) for c in ids}
+
+
+def top_churn(session, limit: int, now: Optional[datetime] = None) -> List[dict]:
+    """The `limit` customers with the highest decayed risk, riskiest first."""
+    rows = session.exec(
+        select(CustomerRisk.customer_id, CustomerRisk.log_mass)
+        .order_by(CustomerRisk.log_mass.desc(), CustomerRisk.customer_id)
+        .limit(limit)
+    ).all()
+    now = now or datetime.utcnow()
+    out = []
+    for cid, log_mass in rows:
+        recent = decayed(log_mass, now)
+        out.append({"customer_id": cid, "risk": round(churn_risk(recent), 4), "recent": round(recent, 3)})
+    return out
+
+
+def bucket_of(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def to_utc_naive(ts: datetime) -> datetime:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def insert_for(session):
+    """Dialect-specific insert() that supports on_conflict_do_update/do_nothing."""
+    return pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+_UPSERTS: Dict[tuple, tuple] = {}
+
+
+def upsert_statement(dialect, model, keys: List[str], cols: Tuple[str, ...],
+                     combine: Optional[Dict[str, Callable]] = None) -> tuple:
+    """(Core upsert, its SQLite SQL or None) for `cols`, built once per dialect and shape."""
+    combine = combine or {}
+    cache_key = (dialect.name, model, tuple(keys), cols, tuple(sorted(combine.items())))
+    hit = _UPSERTS.get(cache_key)
+    if hit is None:
+        table = model.__table__
+        insert = pg_insert if dialect.name == "postgresql" else sqlite_insert
+        ins = insert(table).values({c: bindparam(c) for c in cols})
+        ins = ins.on_conflict_do_update(
+            index_elements=keys,
+            set_={k: combine[k](dialect.name, table.c[k], ins.excluded[k]) if k in combine
+                  else table.c[k] + ins.excluded[k] for k in cols if k not in keys},
+        )
+        # SQLite runs the compiled SQL straight through the driver; other
+        # dialects render binds with casts (:id::INTEGER) that text() can't
+        # parse, so they execute the Core statement
+        sql = str(ins.compile(dialect=type(dialect)(paramstyle="named"))) if dialect.name == "sqlite" else None
+        hit = _UPSERTS[cache_key] = (ins, sql)
+    return hit
+
+
+def upsert_add(session, model, keys: List[str], rows: List[dict],
+               combine: Optional[Dict[str, Callable]] = None):
+    """INSERT ... ON CONFLICT DO UPDATE col = col + n for each row (executemany).
+
+    `combine` maps a column to fn(dialect name, current, incoming) -> SQL to use
+    instead of addition. Atomic under concurrent writers; every row must carry
+    the same columns.
+    """
+    if not rows: return
+    cols = tuple(rows[0])
+    stmt, sql = upsert_statement(session.get_bind().dialect, model, keys, cols, combine)
+    if sql is not None:
+        # hand the dicts straight to the driver, skipping per-row bind
+        # processing (see bulk.executemany); datetimes in SQLAlchemy's format
+        dt_cols = [c for c in cols if isinstance(rows[0][c], datetime)]
+        if dt_cols:
+            rows = [{**r, **{c: r[c].isoformat(" ", "microseconds") for c in dt_cols}} for r in rows]
+        session.connection().exec_driver_sql(sql, rows)
+        return
+    session.execute(stmt, rows)
+
+
+def record_messages(session, rows: Iterable[ScoredMessage]):
+    """Fold scored customer messages into the rollups, in the caller's transaction."""
+    total = dict.fromkeys(COUNTERS, 0)
+    buckets: Dict[datetime, Dict[str, int]] = {}
+    risk: Dict[str, List[float]] = defaultdict(lambda: [0, -math.inf])
+    for customer_id, ts, label, urgent, score in rows:
+        key = bucket_of(ts)
+        b = buckets.get(key)
+        if b is None:
+            b = buckets[key] = dict.fromkeys(COUNTERS, 0)
+        for d in (total, b):
+            d["volume"] += 1
+            d[label] += 1
+            d["urgent"] += int(urgent)
+            d["score_sum"] += score
+        if label == "neg" and urgent:
+            r = risk[customer_id]
+            r[0] += 1
+            r[1] = logaddexp(r[1], churn_log_weight(ts))
+    if not total["volume"]: return
+    upsert_add(session, StatsTotal, ["id"], [{"id": 1, **total}])
+    upsert_add(session, StatsBucket, ["bucket"], [{"bucket": k, **v} for k, v in buckets.items()])
+    upsert_add(session, CustomerRisk, ["customer_id"],
+               [{"customer_id": c, "urgent_neg": n, "log_mass": m} for c, (n, m) in risk.items()],
+               combine={"log_mass": log_add_sql})
+
+
+def rebuild(session, chunk: int = 5000):
+    """Recompute every rollup from the message tables and the archive (one-off backfill)."""
+    for model in (StatsTotal, StatsBucket, CustomerRisk):
+        session.execute(model.__table__.delete())
+    q = (
+        select(Conversation.customer_id, Message.ts, Sentiment.label, Sentiment.urgent, Sentiment.score)
+        .where(Message.id == Sentiment.message_id)
+        .where(Message.sender == "customer")
+        .where(Message.conversation_id == Conversation.id)
+        .execution_options(yield_per=chunk)
+    )
+    for part in session.exec(q).partitions():
+        record_messages(session, part)
+    batch = []
+    for row in archive.scored_messages(session):
+        batch.append(row)
+        if len(batch) >= chunk:
+            record_messages(session, batch); batch = []
+    record_messages(session, batch)
+
+
+ROLLUP_TABLES = {m.__tablename__ for m in (StatsTotal, StatsBucket, CustomerRisk)}
+
+
+def needs_backfill(session, added=()) -> bool:
+    """True when the rollups are missing or init_db just added a column to them."""
+    if any(table in ROLLUP_TABLES for table, _ in added):
+        return True
+    if session.get(StatsTotal, 1) is not None:
+        return False
+    if session.exec(select(Sentiment.id).limit(1)).first() is not None:
+        return True
+    return session.exec(select(ArchivedConversation.id).limit(1)).first() is not None
+
+
+def read_summary(session, since: Optional[datetime] = None, churn_limit: int = 20) -> dict:
+    if since is None:
+        row = session.get(StatsTotal, 1)
+        counts = {c: getattr(row, c) if row else 0 for c in COUNTERS}
+    else:
+        row = session.exec(
+            select(*[func.coalesce(func.sum(getattr(StatsBucket, c)), 0) for c in COUNTERS])
+            .where(StatsBucket.bucket >= bucket_of(since))
+        ).one()
+        counts = dict(zip(COUNTERS, row))
+    return {**counts, "churn": top_churn(session, churn_limit)}
+
+
+# ---------- Conversation inbox fields ----------
+def touch_conversation(conv: Conversation, last: Message, added: int):
+    """Point the conversation's denormalized inbox fields at its newest message."""
+    conv.last_text = last.text
+    conv.last_ts = last.ts
+    if inspect(conv).persistent:
+        conv.message_count = Conversation.message_count + added  # UPDATE ... SET n = n + added
+    else:
+        conv.message_count = (conv.message_count or 0) + added
+
+
+def backfill_conversations(session):
+    """Recompute last_text/last_ts/message_count for every conversation from its messages."""
+    def of_conv(col):
+        return select(col).where(Message.conversation_id == Conversation.id)
+    session.execute(
+        update(Conversation).values(
+            message_count=of_conv(func.count(Message.id)).scalar_subquery(),
+            last_ts=of_conv(func.max(Message.ts)).scalar_subquery(),
+            last_text=of_conv(Message.text).order_by(Message.ts.desc()).limit(1).scalar_subquery(),
+        )
+    )
@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+from .cache import LRUCache
+from .lexicon import URGENT_TOKENS, analyze_batch, scan, simple_sentiment
+
+# ---------- Pluggable sentiment scorers ----------
+# Every scorer returns the dicts the rest of the app already stores:
+#   {"score": float in [-1, 1], "label": "pos" | "neg" | "neu", "urgent": bool}
+# Selected with AURA_SENTIMENT=lexicon (default) | vader.
+
+
+class LexiconScorer:
+    name = "lexicon"
+
+    def score(self, text: str) -> dict:
+        return simple_sentiment(text)
+
+    async def score_async(self, text: str) -> dict:
+        return simple_sentiment(text)
+
+    def score_batch(self, texts: List[str]) -> List[dict]:
+        return [{k: r[k] for k in ("score", "label", "urgent")} for r in analyze_batch(texts)]
+
+    def close(self):
+        pass
+
+
+# VADER lives in the worker (process or thread); one analyzer per worker.
+_analyzer = None
+
+
+def _init_vader():
+    global _analyzer
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def _vader_compounds(texts: List[str]) -> List[float]:
+    if _analyzer is None:
+        _init_vader()
+    return [_analyzer.polarity_scores(t)["compound"] for t in texts]
+
+
+def normalize(text: str) -> str:
+    # whitespace only: VADER reads case and punctuation, so those must stay in the key
+    return " ".join(text.split())
+
+
+class VaderScorer:
+    """VADER compound scores, micro-batched into a worker pool and memoized.
+
+    Single-text calls are queued and shipped to the pool in batches of up to
+    `max_batch` texts or every `window` seconds, so concurrent requests share
+    one round trip and the scoring CPU stays off the request threads.
+    """
+    name = "vader"
+
+    def __init__(self, workers: int = 2, use_processes: bool = True, cache_size: int = 50_000,
+                 window: float = 0.002, max_batch: int = 64, neg_urgent: float = -0.6):
+        _init_vader()  # fail fast if vaderSentiment isn't installed
+        self.cache = LRUCache(cache_size)
+        self.window = window
+        self.max_batch = max_batch
+        self.neg_urgent = neg_urgent
+        self._pool: Executor = (
+            # spawn, not fork: the server process already runs threads
+            ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_vader)
+            if use_processes
+            else ThreadPoolExecutor(workers, thread_name_prefix="aura-vader")
+        )
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="aura-vader-batcher", daemon=True)
+        self._thread.start()
+
+    def to_sentiment(self, text: str, compound: float) -> dict:
+        label = "pos" if compound >= 0.05 else ("neg" if compound <= -0.05 else "neu")
+        urgent = bool(scan(text) & URGENT_TOKENS) or compound <= self.neg_urgent
+        return {"score": round(compound, 4), "label": label, "urgent": urgent}
+
+    def score(self, text: str) -> dict:
+        key = normalize(text)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        fut: Future = Future()
+        self._q.put((key, fut))
+        result = self.to_sentiment(key, fut.result())
+        self.cache.put(key, result)
+        return result
+
+    async def score_async(self, text: str) -> dict:
+        """score() for the event loop: waits on the micro-batch without blocking a thread."""
+        key = normalize(text)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        fut: Future = Future()
+        self._q.put((key, fut))
+        result = self.to_sentiment(key, await asyncio.wrap_future(fut))
+        self.cache.put(key, result)
+        return result
+
+    def score_batch(self, texts: List[str]) -> List[dict]:
+        keys = [normalize(t) for t in texts]
+        out: List[Optional[dict]] = [self.cache.get(k) for k in keys]
+        misses = sorted({k for k, r in zip(keys, out) if r is None})
+        if misses:
+            chunks = [misses[i:i + 512] for i in range(0, len(misses), 512)]
+            fresh = {}
+            for chunk, compounds in zip(chunks, self._pool.map(_vader_compounds, chunks)):
+                for k, c in zip(chunk, compounds):
+                    fresh[k] = self.to_sentiment(k, c)
+                    self.cache.put(k, fresh[k])
+            out = [r if r is not None else fresh[k] for k, r in zip(keys, out)]
+        return out
+
+    def _run(self):
+        while True:
+            first = self._q.get()
+            if first is None: return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0: break
+                try:
+                    item = self._q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._q.put(None)
+                    break
+                batch.append(item)
+            try:
+                compounds = self._pool.submit(_vader_compounds, [k for k, _ in batch]).result()
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), c in zip(batch, compounds):
+                fut.set_result(c)
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+        self._pool.shutdown()
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = make_scorer(os.getenv("AURA_SENTIMENT", "lexicon"))
+    return _scorer
+
+
+def make_scorer(name: str):
+    if name == "lexicon":
+        return LexiconScorer()
+    if name == "vader":
+        return VaderScorer(
+            workers=int(os.getenv("AURA_VADER_WORKERS", "2")),
+            use_processes=os.getenv("AURA_VADER_POOL", "process") == "process",
+            cache_size=int(os.getenv("AURA_SENTIMENT_CACHE", "50000")),
+        )
+    raise ValueError(f"unknown AURA_SENTIMENT {name!r}")
+
+
+def shutdown():
+    global _scorer
+    if _scorer is not None:
+        _scorer.close()
+        _scorer = None
@@ -0,0 +1,123 @@
+import logging
+import re
+from contextlib import contextmanager
+from typing import List, Optional
+
+from sqlalchemy import Boolean, DateTime, Float, String, column, text
+
+log = logging.getLogger("aura.search")
+
+# ---------- Full-text search over Message.text ----------
+# SQLite: an external-content FTS5 table (message_fts) over message.rowid, kept
+#         in sync by triggers, so every insert path (ORM, bulk executemany)
+#         is indexed without extra code. Ranked by bm25().
+#         Bulk imports suspend the insert trigger for their transaction and
+#         index the whole chunk in one INSERT ... SELECT (bulk_indexing).
+# Postgres: a GIN index on to_tsvector('english', text), ranked by ts_rank().
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+PG_TSV = "to_tsvector('english', m.text)"
+
+INSERT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS message_fts_ai AFTER INSERT ON message BEGIN "
+    "INSERT INTO message_fts(rowid, text) VALUES (new.rowid, new.text); END"
+)
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5("
+    "text, content='message', content_rowid='rowid', tokenize='porter unicode61')",
+    INSERT_TRIGGER,
+    "CREATE TRIGGER IF NOT EXISTS message_fts_ad AFTER DELETE ON message BEGIN "
+    "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS message_fts_au AFTER UPDATE OF text ON message BEGIN "
+    "INSERT INTO message_fts(message_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+    "INSERT INTO message_fts(rowid, text) VALUES (new.rowid, new.text); END",
+]
+PG_DDL = [f"CREATE INDEX IF NOT EXISTS ix_message_text_fts ON message USING GIN ({PG_TSV.replace('m.', '')})"]
+
+
+def install(engine):
+    """Create the search index (idempotent); indexes existing rows the first time."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            for ddl in PG_DDL:
+                conn.execute(text(ddl))
+            return
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'message_fts'")).first()
+        for ddl in SQLITE_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            log.info("building message_fts from existing messages")
+            conn.execute(text("INSERT INTO message_fts(message_fts) VALUES ('rebuild')"))
+
+
+@contextmanager
+def bulk_indexing(session):
+    """Index messages inserted inside the block with one statement instead of per-row triggers.
+
+    Runs in the caller's transaction: the DROP/CREATE of the trigger commits or
+    rolls back with the rows, and other writers wait on the write lock meanwhile.
+    """
+    conn = session.connection()
+    if conn.dialect.name != "sqlite" or conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'message_fts_ai'").first() is None:
+        yield
+        return
+    conn.exec_driver_sql("DROP TRIGGER message_fts_ai")
+    # rowids are allocated above the current maximum, so new rows are exactly those past it
+    last = conn.exec_driver_sql("SELECT coalesce(max(rowid), 0) FROM message").scalar()
+    yield
+    conn.exec_driver_sql("INSERT INTO message_fts(rowid, text) SELECT rowid, text FROM message WHERE rowid > ?",
+                         (last,))
+    conn.exec_driver_sql(INSERT_TRIGGER)
+
+
+def fts5_query(q: str) -> str:
+    # every term quoted and ANDed, so user input can't hit FTS5 query syntax
+    return " ".join(f'"{t}"' for t in TERM_RE.findall(q))
+
+
+HIT_COLUMNS = [
+    column("message_id", String), column("conversation_id", String), column("customer_id", String),
+    column("sender", String), column("text", String), column("ts", DateTime),
+    column("label", String), column("urgent", Boolean), column("rank", Float),
+]
+
+
+def search(session, q: str, sender: Optional[str] = None, label: Optional[str] = None,
+           urgent: Optional[bool] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Ranked hits, best first. Raises ValueError when q has no searchable terms."""
+    if not TERM_RE.search(q):
+        raise ValueError("query has no search terms")
+    pg = session.get_bind().dialect.name == "postgresql"
+    params = {"q": q if pg else fts5_query(q), "limit": limit, "offset": offset}
+    where = []
+    if sender is not None:
+        where.append("m.sender = :sender"); params["sender"] = sender
+    if label is not None:
+        where.append("s.label = :label"); params["label"] = label
+    if urgent is not None:
+        where.append("s.urgent = :urgent"); params["urgent"] = urgent
+    extra = "".join(f" AND {w}" for w in where)
+    select_cols = ("m.id AS message_id, m.conversation_id, c.customer_id, m.sender, m.text, m.ts, "
+                   "s.label, s.urgent")
+    if pg:
+        sql = (
+            f"SELECT {select_cols}, ts_rank({PG_TSV}, query) AS rank "
+            "FROM message m JOIN conversation c ON c.id = m.conversation_id "
+            "LEFT JOIN sentiment s ON s.message_id = m.id "
+            "CROSS JOIN websearch_to_tsquery('english', :q) query "
+            f"WHERE {PG_TSV} @@ query{extra} "
+            "ORDER BY rank DESC, m.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        sql = (
+            # bm25() is lower-is-better; negate so both backends rank high-to-low
+            f"SELECT {select_cols}, -bm25(message_fts) AS rank "
+            "FROM message_fts JOIN message m ON m.rowid = message_fts.rowid "
+            "JOIN conversation c ON c.id = m.conversation_id "
+            "LEFT JOIN sentiment s ON s.message_id = m.id "
+            f"WHERE message_fts MATCH :q{extra} "
+            "ORDER BY rank DESC, m.id LIMIT :limit OFFSET :offset"
+        )
+    rows = session.execute(text(sql).columns(*HIT_COLUMNS), params)
+    return [dict(r._mapping) for r in rows]
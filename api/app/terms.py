@@ -0,0 +1,150 @@
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, true
+from sqlmodel import select
+
+from .models import ArchivedConversation, Message, TermBucket, TermTotal
+from .rollups import bucket_of, upsert_add
+from . import archive
+
+# ---------- Term statistics ----------
+# Each customer message is tokenized once, on write, into words (4+ letters,
+# stopwords removed) and pairs of consecutive remaining words. Counts go into
+# an all-time TermTotal and hourly TermBucket rows, in the same transaction as
+# the message, so top issues for any `since` is one GROUP BY over the buckets
+# and trending compares two windows of the same table; nothing rescans text.
+#
+# Stopwords: the built-in list, or one word per line from AURA_STOPWORDS_FILE,
+# plus comma-separated AURA_STOPWORDS. They are applied on write and again when
+# ranking words, so adding one takes effect immediately; pairs written earlier
+# keep it until a rebuild.
+
+WORD_RE = re.compile(r"[a-z]{4,}")
+
+DEFAULT_STOPWORDS = frozenset("""
+    please thank thanks order issue could would about after again also been before being
+    cannot does done from have having hello here just know like make more much need only
+    other over really same some still than that their them then there these they this
+    those very want wants what when where which while will with your yours okay sure
+    didn doesn isn wasn aren weren hasn haven couldn wouldn shouldn
+""".split())
+
+
+def load_stopwords() -> FrozenSet[str]:
+    path = os.getenv("AURA_STOPWORDS_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            words = {line.strip().lower() for line in f if line.strip() and not line.startswith("#")}
+    else:
+        words = set(DEFAULT_STOPWORDS)
+    words |= {w.strip().lower() for w in os.getenv("AURA_STOPWORDS", "").split(",") if w.strip()}
+    return frozenset(words)
+
+
+STOPWORDS = load_stopwords()
+
+
+def terms(text: str) -> Tuple[List[str], List[str]]:
+    """(words, word pairs) counted for one message."""
+    words = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+    return words, [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def record(session, rows: Iterable[Tuple[datetime, str]]):
+    """Fold (ts, text) of customer messages into the term counts, in the caller's transaction."""
+    total: Counter = Counter()
+    buckets: Counter = Counter()
+    for ts, text in rows:
+        b = bucket_of(ts)
+        for n, grams in enumerate(terms(text), start=1):
+            for g in grams:
+                total[n, g] += 1
+                buckets[b, n, g] += 1
+    if not total: return
+    upsert_add(session, TermTotal, ["ngram", "term"],
+               [{"ngram": n, "term": g, "count": c} for (n, g), c in total.items()])
+    upsert_add(session, TermBucket, ["bucket", "ngram", "term"],
+               [{"bucket": b, "ngram": n, "term": g, "count": c} for (b, n, g), c in buckets.items()])
+
+
+def rebuild(session, chunk: int = 5000):
+    """Recompute the term counts from customer messages and the archive (one-off backfill)."""
+    for model in (TermTotal, TermBucket):
+        session.execute(model.__table__.delete())
+    q = (select(Message.ts, Message.text).where(Message.sender == "customer")
+         .execution_options(yield_per=chunk))
+    for part in session.exec(q).partitions():
+        record(session, part)
+    batch = []
+    for row in archive.customer_texts(session):
+        batch.append(row)
+        if len(batch) >= chunk:
+            record(session, batch); batch = []
+    record(session, batch)
+
+
+def needs_backfill(session) -> bool:
+    """True when there are customer messages but no term counts yet."""
+    if session.exec(select(TermTotal.term).limit(1)).first() is not None:
+        return False
+    if session.exec(select(Message.id).where(Message.sender == "customer").limit(1)).first() is not None:
+        return True
+    return session.exec(select(ArchivedConversation.id).limit(1)).first() is not None
+
+
+def _not_stop(col, ngram: int):
+    return col.notin_(sorted(STOPWORDS)) if ngram == 1 else true()
+
+
+def top_terms(session, since: Optional[datetime] = None, limit: int = 5, ngram: int = 1) -> List[tuple]:
+    """[(term, count)] most frequent first; `since` is served from hourly buckets (rounded down)."""
+    if since is None:
+        q = (select(TermTotal.term, TermTotal.count)
+             .where(TermTotal.ngram == ngram, _not_stop(TermTotal.term, ngram))
+             .order_by(TermTotal.count.desc(), TermTotal.term))
+    else:
+        n = func.sum(TermBucket.count).label("n")
+        q = (select(TermBucket.term, n)
+             .where(TermBucket.bucket >= bucket_of(since), TermBucket.ngram == ngram,
+                    _not_stop(TermBucket.term, ngram))
+             .group_by(TermBucket.term)
+             .order_by(n.desc(), TermBucket.term))
+    return [(t, c) for t, c in session.exec(q.limit(limit)).all()]
+
+
+def trending(session, now: Optional[datetime] = None, window: timedelta = timedelta(hours=24),
+             baseline: timedelta = timedelta(days=7), min_count: int = 5, min_ratio: float = 3.0,
+             limit: int = 20, ngram: int = 1) -> List[dict]:
+    """Terms whose rate in the last `window` is at least `min_ratio` times their
+    rate over the preceding `baseline`, strongest rise first.
+
+    `expected` is the baseline count scaled to the window's length; the ratio
+    uses add-one smoothing so terms new in the window rank by their count.
+    """
+    now = now or datetime.utcnow()
+    start = bucket_of(now - window)
+    base_start = bucket_of(now - window - baseline)
+    current = func.sum(case((TermBucket.bucket >= start, TermBucket.count), else_=0)).label("current")
+    before = func.sum(case((TermBucket.bucket < start, TermBucket.count), else_=0)).label("before")
+    rows = session.exec(
+        select(TermBucket.term, current, before)
+        .where(TermBucket.bucket >= base_start, TermBucket.ngram == ngram, _not_stop(TermBucket.term, ngram))
+        .group_by(TermBucket.term)
+        .having(current >= min_count)
+    ).all()
+    scale = window / baseline
+    out = []
+    for term, cur, prev in rows:
+        expected = prev * scale
+        ratio = (cur + 1) / (expected + 1)
+        if ratio >= min_ratio:
+            out.append({"term": term, "count": cur, "expected": round(expected, 2), "ratio": round(ratio, 2),
+                        # how many Poisson standard deviations above the expected count
+                        "z": round((cur - expected) / math.sqrt(expected + 1), 2)})
+    out.sort(key=lambda r: (-r["ratio"], -r["count"], r["term"]))
+    return out[:limit]
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from sqlalchemy import func
+from sqlmodel import select
+
+from .models import Message, Sentiment, StatsBucket
+
+UNITS = ("hour", "day", "week")
+# SQLite strftime modifiers that floor a timestamp to the start of each unit
+# (weeks start on Monday, like Postgres date_trunc('week'))
+SQLITE_FLOOR = {
+    "hour": ("%Y-%m-%d %H:00:00",),
+    "day": ("%Y-%m-%d 00:00:00",),
+    "week": ("%Y-%m-%d 00:00:00", "weekday 0", "-6 days"),
+}
+
+
+# ---------- Time series ----------
+# Counters are aggregated in the database from the hourly StatsBucket rollups,
+# so a series costs one GROUP BY over at most (range in hours) rows. Score
+# percentiles need the raw scores: the database floors each timestamp to its
+# bucket and NumPy groups and ranks the two column arrays.
+
+
+def floor_expr(session, col, unit: str):
+    if session.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(unit, col)
+    fmt, *mods = SQLITE_FLOOR[unit]
+    return func.strftime(fmt, col, *mods)
+
+
+def _as_dt(v) -> datetime:
+    return v if isinstance(v, datetime) else datetime.fromisoformat(v)
+
+
+def series(session, since: datetime, until: datetime, unit: str) -> List[dict]:
+    """Volume, label mix, mean score and urgent rate per bucket; empty buckets are omitted."""
+    b = floor_expr(session, StatsBucket.bucket, unit).label("b")
+    rows = session.exec(
+        select(b, func.sum(StatsBucket.volume), func.sum(StatsBucket.pos), func.sum(StatsBucket.neg),
+               func.sum(StatsBucket.neu), func.sum(StatsBucket.urgent), func.sum(StatsBucket.score_sum))
+        .where(StatsBucket.bucket >= since, StatsBucket.bucket < until)
+        .group_by(b)
+        .order_by(b)
+    ).all()
+    out = []
+    for ts, volume, pos, neg, neu, urgent, score_sum in rows:
+        if not volume: continue
+        out.append({
+            "ts": _as_dt(ts), "volume": volume, "pos": pos, "neg": neg, "neu": neu,
+            "mean_score": round(score_sum / volume, 4),
+            "urgent_rate": round(urgent / volume, 4),
+        })
+    return out
+
+
+def score_percentiles(session, since: datetime, until: datetime, unit: str,
+                      qs: Sequence[float] = (50, 90, 99)) -> Dict[datetime, Dict[str, float]]:
+    """Per-bucket percentiles of customer-message sentiment scores."""
+    import numpy as np
+
+    b = floor_expr(session, Message.ts, unit)
+    q = (
+        select(b, Sentiment.score)
+        .where(Sentiment.message_id == Message.id)
+        .where(Message.ts >= since, Message.ts < until)
+        .execution_options(yield_per=50000)
+    )
+    key_parts, score_parts = [], []
+    for part in session.exec(q).partitions():
+        key_parts.append(np.array([r[0] for r in part], dtype=object))
+        score_parts.append(np.fromiter((r[1] for r in part), dtype=np.float64, count=len(part)))
+    if not key_parts:
+        return {}
+    keys = np.concatenate(key_parts)
+    scores = np.concatenate(score_parts)
+
+    # bucket keys come floored from the database; group by sorting once
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(1, len(uniq)))
+    out = {}
+    for k, part in zip(uniq, np.split(scores[order], bounds)):
+        values = np.percentile(part, qs)
+        out[_as_dt(k)] = {f"p{int(q)}": round(float(v), 4) for q, v in zip(qs, values)}
+    return out
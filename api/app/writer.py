@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from .db import get_async_session, get_session
+from . import db, metrics
+
+log = logging.getLogger("aura.writer")
+
+# A write unit adds its rows to the session it is given; it must not commit.
+WriteFn = Callable[[object], object]
+
+
+class GroupCommitWriter:
+    """Batches write units from concurrent requests into one shared transaction.
+
+    Units queue up for at most `window` seconds or `max_batch` units, then a
+    single writer thread applies each inside its own SAVEPOINT (so one bad
+    unit fails alone) and commits the batch once.
+
+    durability="sync"  -> submit() returns after the batch commit.
+    durability="async" -> submit() returns once queued; failures are logged.
+    Either way `on_commit(result)` runs on the writer thread once the unit is committed.
+    """
+
+    def __init__(self, window: float = 0.005, max_batch: int = 256, durability: str = "sync"):
+        if durability not in ("sync", "async"):
+            raise ValueError("durability must be 'sync' or 'async'")
+        self.window = window
+        self.max_batch = max_batch
+        self.durability = durability
+        self.batches = 0
+        self.units = 0
+        self._q: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="aura-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: WriteFn, on_commit: Optional[Callable] = None):
+        fut = _future(on_commit)
+        self._q.put((fn, fut))
+        if self.durability == "sync":
+            return fut.result()
+        fut.add_done_callback(_log_failure)
+        return None
+
+    async def submit_async(self, fn: WriteFn, on_commit: Optional[Callable] = None):
+        fut = _future(on_commit)
+        self._q.put((fn, fut))
+        if self.durability == "sync":
+            return await asyncio.wrap_future(fut)
+        fut.add_done_callback(_log_failure)
+        return None
+
+    def close(self):
+        self._q.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._q.get()
+            if first is None: return
+            batch, stop = [first], False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0: break
+                try:
+                    item = self._q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop: return
+
+    def _commit(self, batch):
+        applied = []
+        try:
+            with get_session() as session:
+                if session.get_bind().dialect.name == "sqlite":
+                    # the sqlite3 driver only opens a transaction before DML, so
+                    # a leading SAVEPOINT would run outside one and each RELEASE
+                    # would commit by itself; open the batch transaction explicitly
+                    session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+                for fn, fut in batch:
+                    try:
+                        with session.begin_nested():
+                            result = fn(session)
+                    except Exception as e:
+                        fut.set_exception(e)
+                    else:
+                        applied.append((fut, result))
+                with metrics.stage("group_commit"):
+                    session.commit()
+        except Exception as e:
+            # the batch never committed: fail applied units and any the
+            # session/BEGIN failure kept from running, so no caller waits forever
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.batches += 1
+        self.units += len(applied)
+        for fut, result in applied:
+            fut.set_result(result)
+
+
+def _future(on_commit: Optional[Callable]) -> Future:
+    fut: Future = Future()
+    if on_commit is not None:
+        # callbacks run where the result is set: after the commit, on the writer thread
+        fut.add_done_callback(lambda f: f.exception() is None and on_commit(f.result()))
+    return fut
+
+
+def _log_failure(fut: Future):
+    if fut.exception() is not None:
+        log.error("group-commit write failed", exc_info=fut.exception())
+
+
+_writer: Optional[GroupCommitWriter] = None
+
+
+def start_from_env():
+    """Enable group commit when AURA_GROUP_COMMIT=1 (window/size/durability from env)."""
+    global _writer
+    if _writer is None and os.getenv("AURA_GROUP_COMMIT", "0") == "1":
+        _writer = GroupCommitWriter(
+            window=float(os.getenv("AURA_GROUP_COMMIT_WINDOW_MS", "5")) / 1000,
+            max_batch=int(os.getenv("AURA_GROUP_COMMIT_MAX", "256")),
+            durability=os.getenv("AURA_DURABILITY", "sync"),
+        )
+    return _writer
+
+
+def stop():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+def run_write(fn: WriteFn, on_commit: Optional[Callable] = None):
+    """Apply a write unit: through the group-commit writer if enabled, else in its own transaction.
+
+    `on_commit(result)` runs once the unit is committed, also when async
+    durability returns before that.
+    """
+    if _writer is not None:
+        return _writer.submit(fn, on_commit)
+    with get_session() as session:
+        result = fn(session)
+        with metrics.stage("commit"):
+            session.commit()
+    if on_commit is not None:
+        on_commit(result)
+    return result
+
+
+_write_lock: Optional[asyncio.Lock] = None
+
+
+async def run_write_async(fn: WriteFn, on_commit: Optional[Callable] = None):
+    """run_write for async routes; the unit runs on the async driver's connection via run_sync.
+
+    SQLite has a single writer: concurrent transactions would spin in the busy
+    handler, so async writers queue on a lock instead (FIFO, no sleep/retry).
+    """
+    global _write_lock
+    if _writer is not None:
+        return await _writer.submit_async(fn, on_commit)
+    if db.async_engine.dialect.name != "sqlite":
+        result = await _write(fn)
+    else:
+        if _write_lock is None:
+            _write_lock = asyncio.Lock()
+        async with _write_lock:
+            result = await _write(fn)
+    if on_commit is not None:
+        on_commit(result)
+    return result
+
+
+async def _write(fn: WriteFn):
+    async with get_async_session() as session:
+        result = await session.run_sync(fn)
+        with metrics.stage("commit"):
+            await session.commit()
+        return result
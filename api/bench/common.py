@@ -0,0 +1,39 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    s = sorted(samples_ms)
+    def pick(q):
+        return round(s[min(len(s) - 1, int(q * len(s)))], 3)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(s[-1], 3)}
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(kind: str, params: dict, results: dict) -> str:
+    """Write results to bench/results/<kind>-<rev>-<timestamp>.json and return the path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    rev = git_rev()
+    path = os.path.join(RESULTS_DIR, f"{kind}-{rev}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "kind": kind, "rev": rev, "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "machine": platform.machine(),
+            "params": params, "results": results,
+        }, f, indent=2)
+    return path
@@ -0,0 +1,27 @@
+"""Compare two saved benchmark result files.
+
+    python -m bench.compare bench/results/load-<old>.json bench/results/load-<new>.json
+"""
+import json
+import sys
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    old, new = (json.load(open(p)) for p in sys.argv[1:])
+    print(f"{old['kind']}: {old['rev']} ({old['at']}) -> {new['rev']} ({new['at']})")
+    for name, n in new["results"].items():
+        o = old["results"].get(name)
+        if o is None:
+            continue
+        cells = []
+        for metric, v in n.items():
+            ov = o.get(metric)
+            if isinstance(v, (int, float)) and isinstance(ov, (int, float)) and ov:
+                cells.append(f"{metric} {ov:g} -> {v:g} ({(v - ov) / ov * 100:+.1f}%)")
+        print(f"  {name:18s} " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Fill a database with synthetic customers, conversations, messages and sentiment.
+
+    python -m bench.generate --messages 1000000 [--db URL]
+
+Writes to a scratch SQLite file, bench/data/bench.db, unless --db is given;
+it never touches AURA_DATABASE_URL or data/aura.db. Rows go through the bulk importer, so rollups and inbox fields are populated
+exactly as in production. Ratios (conversations per customer, turns per
+conversation, sentiment mix) are fixed by --seed for reproducible runs.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import bulk, db
+from app.models import FAQ as FAQModel
+
+SCRATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SCRATCH_URL = f"sqlite:///{os.path.join(SCRATCH_DIR, 'bench.db')}"
+
+OPENERS = [
+    "I am angry my order is late and want a refund asap",
+    "Can you tell me your pricing plans?",
+    "Where is my order? tracking hasn't updated in days",
+    "My payment failed again, please fix this now!",
+    "I can't login, password reset isn't working",
+    "Love the product, thanks for the quick help",
+    "Hi there, I have a question about my invoice",
+    "The app keeps crashing when I try to check out",
+    "Great experience overall, thank you team!",
+    "I was charged twice this month, this is ridiculous",
+    "Do you ship to Canada? what does delivery cost",
+    "I need to talk to a manager about this complaint",
+]
+FOLLOWUPS = [
+    "order {n}", "it's order #{n}", "still waiting on this", "any update?", "ok thanks",
+    "that didn't work", "can I upgrade my plan", "please escalate", "perfect, that helps", "hello?",
+]
+BOT = ["Thanks! Noted.", "I can check that. Could you share your order ID?", "Sure, here are the details."]
+FAQ_TOPICS = ["refund", "pricing", "shipping", "delivery", "invoice", "password", "login", "account",
+              "billing", "upgrade", "cancel", "warranty", "returns", "tracking", "payment", "support"]
+
+
+def seed_faqs(n: int, rnd: random.Random):
+    with db.get_session() as session:
+        for i in range(n):
+            topics = rnd.sample(FAQ_TOPICS, 3)
+            session.merge(FAQModel(id=f"bench_faq_{i}", question=f"How does {topics[0]} work for {topics[1]}?",
+                                   answer=f"Answer {i} about {topics[0]}.", tags=topics))
+        session.commit()
+
+
+def generate(messages: int, customers: int, days: int, seed: int, faqs: int):
+    rnd = random.Random(seed)
+    seed_faqs(faqs, rnd)
+    imp = bulk.Importer(bulk.start_job(f"bench-generate-{seed}"))
+    end = datetime.utcnow()
+    span = days * 86400
+    written, conv_n = 0, 0
+    while written < messages:
+        customer = f"cust_{rnd.randrange(customers):07d}"
+        conv_id = f"bench_{seed}_{conv_n:09d}"
+        conv_n += 1
+        turns = min(messages - written, max(2, int(rnd.expovariate(1 / 8))))  # mean ~8 messages
+        ts = end - timedelta(seconds=rnd.random() * span)
+        rows = []
+        for j in range(turns):
+            if j % 2 == 0:
+                text = rnd.choice(OPENERS) if j == 0 else rnd.choice(FOLLOWUPS).format(n=rnd.randrange(10**6))
+                sender = "customer"
+            else:
+                text, sender = rnd.choice(BOT), ("agent" if rnd.random() < 0.1 else "bot")
+            rows.append({"id": None, "conversation_id": conv_id, "sender": sender, "text": text, "ts": ts})
+            ts += timedelta(seconds=rnd.expovariate(1 / 40))
+        imp.add(conv_id, customer, rows)
+        written += turns
+        if imp.full:
+            imp.flush()
+    imp.flush()
+    return {"messages": imp.job.messages, "conversations": conv_n, "customers": customers}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--messages", type=int, default=100_000)
+    ap.add_argument("--customers", type=int, default=None, help="default: messages / 40")
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--faqs", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--db", default=SCRATCH_URL, help="database URL (default: bench/data/bench.db)")
+    args = ap.parse_args()
+    scratch = args.db == SCRATCH_URL
+    if scratch:
+        os.makedirs(SCRATCH_DIR, exist_ok=True)
+    db.configure(args.db, "sqlite" if scratch else None)
+    db.init_db()
+    t = time.perf_counter()
+    out = generate(args.messages, args.customers or max(1, args.messages // 40), args.days, args.seed, args.faqs)
+    elapsed = time.perf_counter() - t
+    print(f"{out['messages']} messages / {out['conversations']} conversations in {elapsed:.1f}s "
+          f"({out['messages'] / elapsed:,.0f} msg/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Load driver for the main API routes.
+
+    python -m bench.load [--concurrency 32] [--duration 10] [--db URL] [--endpoints send,history]
+    python -m bench.load --url http://127.0.0.1:8000 --concurrency 128
+
+By default drives the ASGI app in-process through httpx's ASGITransport (no
+sockets), so numbers reflect the app and database, not the network. For each
+endpoint it runs --concurrency workers for --duration seconds and reports
+throughput and p50/p95/p99 latency; results are saved under bench/results/
+for comparison (see bench.compare). Point --db at a database filled by
+bench.generate to measure at scale; the default is a fresh scratch database.
+
+With --url it drives a running server instead (e.g. uvicorn app.main:app).
+Use this for high connection counts: in-process, the client competes with
+the app for the same event loop and CPU.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from sqlmodel import select
+
+from app import db
+from bench.common import percentiles, save
+from bench.micro import corpus
+
+KEY = {"x-api-key": "manager-demo-key"}
+
+
+def requests_for(name: str, texts, conv_ids, rnd: random.Random):
+    if name == "send":
+        return lambda: ("POST", "/api/chat/send", {"json": {
+            "customer_id": f"load_{rnd.randrange(5000)}", "message": rnd.choice(texts),
+            "conversation_id": rnd.choice(conv_ids) if conv_ids and rnd.random() < 0.5 else None}})
+    if name == "history":
+        return lambda: ("GET", "/api/chat/history", {"params": {"conversation_id": rnd.choice(conv_ids)}})
+    if name == "conversations":
+        return lambda: ("GET", "/api/conversations", {"params": {"limit": 50}, "headers": KEY})
+    if name == "summary":
+        return lambda: ("GET", "/api/analytics/summary", {"headers": KEY})
+    raise ValueError(name)
+
+
+async def drive(client: httpx.AsyncClient, make, concurrency: int, duration: float):
+    lat, errors = [], 0
+    stop = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop:
+            method, url, kw = make()
+            t = time.perf_counter()
+            try:
+                r = await client.request(method, url, **kw)
+            except httpx.TransportError:  # e.g. a keep-alive connection the server just closed
+                errors += 1
+                continue
+            lat.append((time.perf_counter() - t) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {"requests": len(lat), "errors": errors, "rps": round(len(lat) / elapsed, 1), **percentiles(lat)}
+
+
+async def drive_all(client: httpx.AsyncClient, args, conv_ids):
+    rnd = random.Random(args.seed)
+    texts = corpus(500, args.seed)
+    results = {}
+    for name in args.endpoints.split(","):
+        results[name] = await drive(client, requests_for(name, texts, conv_ids, rnd),
+                                    args.concurrency, args.duration)
+        r = results[name]
+        print(f"{name:14s} {r['rps']:9.1f} req/s  p50 {r['p50']:8.2f} ms  p95 {r['p95']:8.2f} ms  "
+              f"p99 {r['p99']:8.2f} ms  errors {r['errors']}")
+    return results
+
+
+async def run(args):
+    if args.url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            page = await client.get("/api/conversations", params={"limit": 500}, headers=KEY)
+            return await drive_all(client, args, [c["id"] for c in page.json()])
+
+    from app.main import app
+    from app.models import Conversation
+    await app.router.startup()
+    try:
+        with db.get_session() as session:
+            conv_ids = list(session.exec(select(Conversation.id).limit(10_000)))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await drive_all(client, args, conv_ids)
+    finally:
+        await app.router.shutdown()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--endpoints", default="send,history,conversations,summary")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--db", default=None)
+    ap.add_argument("--url", default=None, help="drive a running server instead of the in-process app")
+    args = ap.parse_args()
+    if not args.url:
+        db.configure(args.db, None if args.db else "memory")
+    results = asyncio.run(run(args))
+    print("saved", save("load", vars(args), results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-function microbenchmarks for the chat hot path.
+
+    python -m bench.micro [--faqs 1000] [--number 2000] [--db URL]
+
+Times simple_sentiment, detect_intent, match_faq and generate_reply over a
+fixed corpus and reports the median time per call across --repeat runs.
+Uses a throwaway scratch database unless --db is given.
+"""
+import argparse
+import random
+import statistics
+import timeit
+
+from app import db
+from bench.common import save
+from bench.generate import FOLLOWUPS, OPENERS, seed_faqs
+
+
+def corpus(n: int, seed: int):
+    rnd = random.Random(seed)
+    return [rnd.choice(OPENERS) if rnd.random() < 0.6 else rnd.choice(FOLLOWUPS).format(n=rnd.randrange(10**6))
+            for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--faqs", type=int, default=1000)
+    ap.add_argument("--number", type=int, default=2000, help="calls per repeat")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--db", default=None)
+    args = ap.parse_args()
+    db.configure(args.db, None if args.db else "memory")
+    db.init_db()
+    seed_faqs(args.faqs, random.Random(args.seed))
+
+    from app.lexicon import detect_intent, simple_sentiment
+    from app.main import generate_reply, match_faq
+
+    texts = corpus(args.number, args.seed)
+    results = {}
+    with db.get_session() as session:
+        match_faq(texts[0], session)  # warm the FAQ index
+        cases = {
+            "simple_sentiment": lambda: [simple_sentiment(t) for t in texts],
+            "detect_intent": lambda: [detect_intent(t) for t in texts],
+            "match_faq": lambda: [match_faq(t, session) for t in texts],
+            "generate_reply": lambda: [generate_reply(t, session) for t in texts],
+        }
+        for name, fn in cases.items():
+            runs = timeit.repeat(fn, number=1, repeat=args.repeat)
+            per_call_us = [r / len(texts) * 1e6 for r in runs]
+            results[name] = {"median_us": round(statistics.median(per_call_us), 3),
+                             "min_us": round(min(per_call_us), 3)}
+            print(f"{name:18s} {results[name]['median_us']:10.2f} us/call  (min {results[name]['min_us']:.2f})")
+    print("saved", save("micro", vars(args), results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import pytest
+
+from app import db, models  # noqa: F401  (models registers the tables)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A fresh file-backed SQLite database behind db.engine / db.async_engine."""
+    db.configure(f"sqlite:///{tmp_path / 'aura.db'}", "sqlite")
+    db.init_db()
+    yield db.engine
+    db.engine.dispose()
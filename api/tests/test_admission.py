@@ -0,0 +1,31 @@
+import pytest
+
+from app import admission
+from app.admission import TokenBuckets
+
+
+def test_take_up_to_grants_what_the_bucket_holds():
+    b = TokenBuckets(rate=10, burst=200)
+    assert b.take_up_to("k", 300, now=0) == (200, 0.1)
+    granted, wait = b.take_up_to("k", 300, now=0)
+    assert granted == 0 and wait == 0.1
+    # after refilling, part of the next oversized batch gets through again
+    assert b.take_up_to("k", 300, now=5)[0] == 50
+
+
+def test_lru_eviction():
+    b = TokenBuckets(rate=1, burst=2, maxsize=3)
+    for k in "abcd":
+        b.take(k, now=0)
+    assert list(b._buckets) == ["b", "c", "d"]
+
+
+def test_customer_rejection_refunds_the_key(monkeypatch):
+    monkeypatch.setattr(admission, "customers", TokenBuckets(rate=1e-9, burst=1))
+    monkeypatch.setattr(admission, "api_keys", TokenBuckets(rate=1e-9, burst=5))
+    admission.check_rate("noisy", "shared")
+    for _ in range(3):
+        with pytest.raises(admission.Rejected) as e:
+            admission.check_rate("noisy", "shared")
+        assert e.value.reason == "customer"
+    assert admission.api_keys._buckets["shared"][0] == pytest.approx(4)
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import admission
+from app.admission import TokenBuckets
+from app.main import app
+
+
+def test_non_object_items_fail_alone(sqlite_db):
+    items = [42, "text", None, {"customer_id": "c1", "message": "hello"}]
+    with TestClient(app) as client:
+        r = client.post("/api/chat/send_batch", json={"items": items})
+    assert r.status_code == 200
+    results = r.json()
+    assert [x["ok"] for x in results] == [False, False, False, True]
+    assert all(x["error"].startswith("invalid item:") for x in results[:3])
+
+
+def test_key_is_not_charged_for_items_rejected_per_customer(sqlite_db, monkeypatch):
+    monkeypatch.setattr(admission, "customers", TokenBuckets(rate=1e-9, burst=3))
+    monkeypatch.setattr(admission, "api_keys", TokenBuckets(rate=1e-9, burst=10))
+    items = [{"customer_id": "noisy", "message": "hi"}] * 5 + [{"customer_id": "quiet", "message": "hi"}]
+    with TestClient(app) as client:
+        r = client.post("/api/chat/send_batch", json={"items": items}, headers={"x-api-key": "shared"})
+    assert [x["ok"] for x in r.json()] == [True] * 3 + [False] * 2 + [True]
+    assert admission.api_keys._buckets["shared"][0] == pytest.approx(6)
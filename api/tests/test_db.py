@@ -0,0 +1,37 @@
+import asyncio
+import threading
+
+from sqlmodel import select
+
+from app import db
+from app.models import FAQ
+
+
+def test_memory_backend_serializes_sync_and_async_writers():
+    db.configure(None, "memory")
+    db.init_db()
+    seen = []
+
+    def sync_write():
+        with db.get_session() as session:
+            seen.extend(session.exec(select(FAQ.id)).all())
+            session.add(FAQ(id="b", question="q", answer="a", tags=[]))
+            session.commit()  # waits for the async transaction instead of "table is locked"
+
+    async def main():
+        async with db.get_async_session() as session:
+            session.add(FAQ(id="a", question="q", answer="a", tags=[]))
+            await session.flush()
+            t = threading.Thread(target=sync_write)
+            t.start()
+            await asyncio.sleep(0.2)
+            await session.commit()
+            await asyncio.to_thread(t.join)
+
+    try:
+        asyncio.run(main())
+        assert seen == []  # no dirty read of the uncommitted row
+        with db.get_session() as session:
+            assert sorted(session.exec(select(FAQ.id)).all()) == ["a", "b"]
+    finally:
+        db.engine.dispose()
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app import bulk
+from app.models import Conversation, Message
+
+
+def test_export_order_and_early_csv_header(sqlite_db):
+    t0 = datetime(2026, 3, 1)
+    with Session(sqlite_db) as session:
+        for c, cust in (("c2", "alice"), ("c1", "bob"), ("c3", "alice")):
+            session.add(Conversation(id=c, customer_id=cust))
+        # interleaved across conversations in time
+        for i, c in enumerate(["c2", "c1", "c3", "c1", "c2", "c3"]):
+            session.add(Message(id=f"m{i}", conversation_id=c, sender="customer", text="hi", ts=t0 + timedelta(minutes=i)))
+        session.commit()
+
+    it = bulk.iter_export(bulk.export_query(since=t0 + timedelta(minutes=1)), "csv")
+    assert next(it) == ",".join(bulk.EXPORT_COLUMNS) + "\r\n"  # sent before any row is read
+    rows = [line.split(",")[0] for line in "".join(it).splitlines()]
+    assert rows == ["m1", "m2", "m3", "m4", "m5"]  # time range: by ts
+
+    ndjson = "".join(bulk.iter_export(bulk.export_query(customer_id="alice"), "ndjson"))
+    assert [line.split('"')[3] for line in ndjson.splitlines()] == ["m0", "m4", "m2", "m5"]  # by conversation, then ts
@@ -0,0 +1,63 @@
+import random
+import re
+import time
+
+from sqlmodel import Session, select
+
+from app.faq_index import FAQIndex
+from app.models import FAQ
+
+
+def old_match_faq(text: str, session):
+    """The linear overlap scan the index replaced."""
+    tokens = set(re.findall(r"[a-zA-Z]{4,}", text.lower()))
+    if not tokens: return None
+    best, best_score = None, 0
+    for faq in session.exec(select(FAQ)).all():
+        q_tokens = set(re.findall(r"[a-zA-Z]{4,}", faq.question.lower()))
+        tag_tokens = set([t.lower() for t in (faq.tags or [])])
+        overlap = len(tokens & (q_tokens | tag_tokens))
+        if overlap > best_score:
+            best_score, best = overlap, faq
+    return best if best_score >= 1 else None
+
+
+def test_index_matches_old_overlap_scan(sqlite_db):
+    rng = random.Random(3)
+    vocab = ["refund", "order", "delivery", "ship", "password", "reset", "billing", "card",
+             "plan", "price", "Track", "login", "cancel", "account", "abc", "PRO"]
+    with Session(sqlite_db) as session:
+        for i in range(60):
+            question = " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 5))) + "?"
+            tags = [rng.choice(vocab) for _ in range(rng.randint(0, 3))]
+            session.add(FAQ(id=f"f{i:02d}", question=question, answer=f"a{i}", tags=tags))
+        session.commit()
+        index = FAQIndex()
+        texts = ["", "hi", "xyz"] + [" ".join(rng.choice(vocab) for _ in range(rng.randint(1, 6)))
+                                     for _ in range(500)]
+        for text in texts:
+            old, new = old_match_faq(text, session), index.match(text, session)
+            assert (old and old.id) == (new and new.id), text
+
+
+def test_index_reloads_writes_from_other_workers_after_max_age(sqlite_db):
+    index = FAQIndex(max_age=0.05)
+    with Session(sqlite_db) as session:
+        session.add(FAQ(id="f1", question="How do refunds work?", answer="Refund answer", tags=["refund"]))
+        session.commit()
+        assert index.match("refund please", session).id == "f1"
+        version = index.version
+
+        # written by another worker: this index doesn't see it until it is stale
+        session.add(FAQ(id="f2", question="Where is my delivery?", answer="Delivery answer", tags=[]))
+        session.commit()
+        assert index.match("delivery status", session) is None
+        time.sleep(0.06)
+        assert not index.fresh
+        assert index.match("delivery status", session).id == "f2"
+        assert index.version == version + 1
+
+        # a reload that finds the same rows keeps cached replies valid
+        time.sleep(0.06)
+        index.rebuild(session)
+        assert index.fresh and index.version == version + 1
@@ -0,0 +1,49 @@
+import random
+from typing import Optional
+
+from app import lexicon
+from app.lexicon import INTENT_RULES, NEG_WORDS, POS_WORDS, URGENT_TOKENS
+
+
+# ---------- Reference: the per-keyword substring scans the matcher replaced ----------
+def old_simple_sentiment(text: str) -> dict:
+    t = text.lower()
+    pos = sum(1 for w in POS_WORDS if w in t)
+    neg = sum(1 for w in NEG_WORDS if w in t)
+    score = 0.0
+    if pos > neg: score = min(1.0, 0.25*(pos-neg))
+    elif neg > pos: score = max(-1.0, -0.25*(neg-pos))
+    label = "pos" if score > 0.05 else ("neg" if score < -0.05 else "neu")
+    urgent = any(tok in t for tok in URGENT_TOKENS) or (label=="neg" and neg>=2)
+    return {"score": score, "label": label, "urgent": urgent}
+
+
+def old_detect_intent(text: str) -> Optional[str]:
+    t = text.lower()
+    for intent, keys in INTENT_RULES:
+        if any(k in t for k in keys):
+            return intent
+    return None
+
+
+def corpus(n: int, seed: int = 7):
+    """Texts glued together from keywords, keyword fragments and filler, in mixed case."""
+    rng = random.Random(seed)
+    keywords = sorted(POS_WORDS | NEG_WORDS | URGENT_TOKENS | {k for _, keys in INTENT_RULES for k in keys})
+    pieces = keywords + [k[:rng.randint(1, len(k))] for k in keywords] + ["", " ", "!", "x", "order", "the"]
+    texts = ["", "   ", "HI there", "thank you!", "no refunds", "can't log in now", "hi", "this"]
+    for _ in range(n):
+        words = [rng.choice(pieces) for _ in range(rng.randint(1, 8))]
+        text = rng.choice(["", " "]).join(words)
+        texts.append("".join(c.upper() if rng.random() < 0.2 else c for c in text))
+    return texts
+
+
+def test_matches_old_substring_scans():
+    texts = corpus(5000)
+    for text in texts:
+        assert lexicon.simple_sentiment(text) == old_simple_sentiment(text), text
+        assert lexicon.detect_intent(text) == old_detect_intent(text), text
+    expected = [{**old_simple_sentiment(t), "intent": old_detect_intent(t)} for t in texts]
+    assert [lexicon.analyze(t) for t in texts] == expected
+    assert lexicon.analyze_batch(texts) == expected
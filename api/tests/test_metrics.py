@@ -0,0 +1,8 @@
+from app import db, metrics
+
+
+def test_render_reports_both_pools(sqlite_db):
+    text = metrics.render({"sync": db.engine, "async": db.async_engine.sync_engine})
+    assert text.count("# TYPE aura_db_pool_size gauge") == 1
+    assert 'aura_db_pool_size{engine="sync"}' in text
+    assert 'aura_db_pool_size{engine="async"}' in text
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app import rollups
+from app.models import CustomerRisk, StatsBucket
+
+
+def test_churn_mass_survives_past_float_overflow(sqlite_db):
+    # with the 14-day default, 2**((ts - epoch) / half_life) overflowed a float in 2063
+    ts = datetime(2090, 6, 1)
+    with Session(sqlite_db) as session:
+        rollups.record_messages(session, [("a", ts, "neg", True, -0.8), ("a", ts, "neg", True, -0.8)])
+        rollups.record_messages(session, [("a", ts, "neg", True, -0.8),
+                                          ("b", ts - timedelta(seconds=rollups.CHURN_HALF_LIFE_S), "neg", True, -0.5)])
+        session.commit()
+        top = rollups.top_churn(session, 10, now=ts)
+        assert [r["customer_id"] for r in top] == ["a", "b"]
+        assert top[0]["recent"] == pytest.approx(3.0, abs=1e-3)
+        assert top[1]["recent"] == pytest.approx(0.5, abs=1e-3)
+        # a month later both have decayed by the same factor
+        later = rollups.top_churn(session, 10, now=ts + timedelta(days=28))
+        assert later[0]["recent"] == pytest.approx(0.75, abs=1e-3)
+
+
+def test_half_life_must_be_positive(monkeypatch):
+    for bad in ("0", "-3", "inf", "nan"):
+        monkeypatch.setenv("AURA_CHURN_HALF_LIFE_DAYS", bad)
+        with pytest.raises(ValueError):
+            rollups._half_life_s()
+    monkeypatch.setenv("AURA_CHURN_HALF_LIFE_DAYS", "1")
+    assert rollups._half_life_s() == 86400
+
+
+def test_postgres_upsert_compiles_and_binds():
+    from sqlalchemy.dialects.postgresql import psycopg
+
+    dialect = psycopg.dialect()
+    row = {"customer_id": "a", "urgent_neg": 1, "log_mass": 2.5}
+    stmt, sql = rollups.upsert_statement(dialect, CustomerRisk, ["customer_id"], tuple(row),
+                                         {"log_mass": rollups.log_add_sql})
+    assert sql is None
+    compiled = stmt.compile(dialect=dialect)
+    assert "ON CONFLICT (customer_id) DO UPDATE" in compiled.string
+    assert "greatest(customerrisk.log_mass, excluded.log_mass)" in compiled.string
+    assert compiled.construct_params(row) == row
+
+
+def test_core_upsert_path_accumulates(sqlite_db):
+    # the statement other dialects execute, run here against SQLite
+    with Session(sqlite_db) as session:
+        stmt, _ = rollups.upsert_statement(session.get_bind().dialect, StatsBucket, ["bucket"], ("bucket", "volume"))
+        ts = datetime(2026, 1, 1, 10)
+        session.execute(stmt, [{"bucket": ts, "volume": 2}])
+        session.execute(stmt, [{"bucket": ts, "volume": 3}])
+        assert session.get(StatsBucket, ts).volume == 5
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app import bulk, search
+from app.models import Conversation, Message
+
+
+def import_messages(n, start=0, ids=None):
+    imp = bulk.Importer(bulk.start_job())
+    t0 = datetime(2026, 2, 1)
+    imp.add("conv", "cust", [{"id": ids[i] if ids else None, "conversation_id": "conv", "sender": "customer",
+                              "text": f"refund request {i}", "ts": t0 + timedelta(seconds=i)}
+                             for i in range(start, start + n)])
+    imp.flush()
+    return imp.job
+
+
+def test_bulk_import_indexes_chunk_and_restores_trigger(sqlite_db):
+    search.install(sqlite_db)
+    with Session(sqlite_db) as session:
+        session.add(Conversation(id="c0", customer_id="x"))
+        session.add(Message(id="m0", conversation_id="c0", sender="customer", text="refund first", ts=datetime(2026, 1, 1)))
+        session.commit()
+    import_messages(50)
+    job = import_messages(2, ids=["m0", "dup"])  # id collision: the chunk is rejected and rolled back
+    assert job.error_count == 1
+
+    with Session(sqlite_db) as session:
+        session.add(Message(id="m1", conversation_id="c0", sender="customer", text="refund last", ts=datetime(2026, 3, 1)))
+        session.commit()
+        triggers = session.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars().all()
+        assert "message_fts_ai" in triggers
+        session.execute(text("INSERT INTO message_fts(message_fts) VALUES ('integrity-check')"))
+        assert len(search.search(session, "refund", limit=100)) == 52
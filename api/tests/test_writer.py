@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from app import db, writer
+from app.models import FAQ
+
+
+def test_group_commit_commits_once_per_batch(sqlite_db):
+    statements = []
+
+    @event.listens_for(sqlite_db, "connect")
+    def trace(dbapi_conn, _):
+        dbapi_conn.set_trace_callback(statements.append)
+
+    sqlite_db.dispose()  # reconnect so the trace hook is installed
+    w = writer.GroupCommitWriter(window=0.5, max_batch=5)
+    barrier = threading.Barrier(5)
+
+    def unit(i):
+        def fn(session):
+            session.add(FAQ(id=f"f{i}", question="q", answer="a", tags=[]))
+        return fn
+
+    def submit(i):
+        barrier.wait()
+        w.submit(unit(i))
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(5)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    w.close()
+
+    assert w.batches == 1 and w.units == 5
+    # one BEGIN ... COMMIT around all five SAVEPOINT/RELEASE pairs
+    sql = [s.split()[0].upper() for s in statements]
+    assert sql.count("BEGIN") == 1
+    assert sql.count("COMMIT") == 1
+    assert sql.count("RELEASE") == 5
+    with db.get_session() as session:
+        assert session.exec(select(func.count()).select_from(FAQ)).one() == 5
+
+
+def test_failed_batch_begin_fails_every_waiter(sqlite_db):
+    @event.listens_for(sqlite_db, "connect")
+    def short_busy_timeout(dbapi_conn, _):
+        dbapi_conn.execute("PRAGMA busy_timeout=100")
+
+    sqlite_db.dispose()
+    locker = sqlite3.connect(sqlite_db.url.database, isolation_level=None)
+    locker.execute("BEGIN IMMEDIATE")  # another writer holds the lock past the busy timeout
+    w = writer.GroupCommitWriter(window=0.2, max_batch=3)
+    errors = []
+
+    def submit(i):
+        try:
+            w.submit(lambda session: session.add(FAQ(id=f"f{i}", question="q", answer="a", tags=[])))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(i,), daemon=True) for i in range(3)]
+    try:
+        for t in threads: t.start()
+        for t in threads: t.join(timeout=5)
+        assert not any(t.is_alive() for t in threads)
+        assert len(errors) == 3 and all("locked" in str(e) for e in errors)
+    finally:
+        locker.rollback()
+        locker.close()
+        w.close()
+
+
+def test_async_durability_still_delivers_results_after_commit(sqlite_db):
+    w = writer.GroupCommitWriter(window=0.01, durability="async")
+    delivered = []
+    done = threading.Event()
+
+    def fn(session):
+        session.add(FAQ(id="f1", question="q", answer="a", tags=[]))
+        return [{"type": "delta"}]
+
+    def on_commit(events):
+        with db.get_session() as session:  # already visible to other connections
+            delivered.append((events, session.get(FAQ, "f1") is not None))
+        done.set()
+
+    assert w.submit(fn, on_commit) is None
+    assert done.wait(5)
+    w.close()
+    assert delivered == [([{"type": "delta"}], True)]
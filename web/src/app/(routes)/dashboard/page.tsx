@@ -40,6 +40,38 @@ console.log('API base =', API);
 
   useEffect(() => { load(); }, []);
 
+  // live updates: apply pushed deltas instead of re-polling the summary
+  useEffect(() => {
+    const es = new EventSource(`${API}/api/analytics/stream?api_key=${encodeURIComponent(key)}`);
+    es.addEventListener('delta', (ev) => {
+      const d = JSON.parse((ev as MessageEvent).data);
+      setData((prev) => prev && {
+        ...prev,
+        volume: prev.volume + (d.volume ?? 0),
+        sentiment_trend: {
+          pos: prev.sentiment_trend.pos + (d.pos ?? 0),
+          neu: prev.sentiment_trend.neu + (d.neu ?? 0),
+          neg: prev.sentiment_trend.neg + (d.neg ?? 0),
+        },
+      });
+    });
+    es.addEventListener('churn', (ev) => {
+      const c = JSON.parse((ev as MessageEvent).data) as { customer_id: string; risk: number };
+      setData((prev) => prev && {
+        ...prev,
+        churn: {
+          // keep the riskiest-first top-K the summary returned
+          by_customer: [
+            ...prev.churn.by_customer.filter((x) => x.customer_id !== c.customer_id),
+            { customer_id: c.customer_id, risk: c.risk },
+          ].sort((a, b) => b.risk - a.risk).slice(0, Math.max(prev.churn.by_customer.length, 20)),
+        },
+      });
+    });
+    es.addEventListener('resync', () => { load(); });
+    return () => es.close();
+  }, [key]);
+
 
 
   const pieData = data